@@ -1,21 +1,62 @@
 import boto3
+import concurrent.futures
 import os
-from typing import Dict, Any, List
+import random
+from botocore.config import Config
+from typing import Dict, Any, List, Optional
+
+# One session + resource per process. Building a resource parses the service model,
+# resolves credentials and opens a new connection pool, so every table shares this one.
+_SESSION = boto3.Session(
+    region_name=os.getenv("AWS_REGION", "us-east-1"),
+    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
+)
+# Enough sockets for the parallel sync + batch-write fan-out; adaptive mode makes the
+# SDK retry throttling errors itself with client-side rate limiting.
+_DDB_RESOURCE = _SESSION.resource(
+    'dynamodb',
+    config=Config(
+        max_pool_connections=64,
+        retries={'max_attempts': 10, 'mode': 'adaptive'},
+        connect_timeout=3,
+        read_timeout=10,
+        tcp_keepalive=True
+    )
+)
+
+# Shared by every batch write in the process. Meta and Google syncs write several
+# ranges at once, so one bounded pool replaces a fresh pool per call.
+_WRITE_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=8, thread_name_prefix="ddb-write")
+# Same for the per-range GSI queries behind the dashboard reads
+_READ_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=8, thread_name_prefix="ddb-read")
+
+def get_dynamodb_resource():
+    """Returns the process-wide DynamoDB resource, for tables outside the DynamoDB wrapper."""
+    return _DDB_RESOURCE
+
+def _backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff so throttled workers don't retry in lockstep."""
+    return random.uniform(0, min((2 ** attempt) * 0.1, 2.0))
 
 class DynamoDB:
-    def __init__(self, table_name: str = None):
+    # BatchWriteItem's hard per-request cap
+    BATCH_WRITE_LIMIT = 25
+
+    # Tables/GSIs already confirmed this process, so repeat calls skip the DescribeTable
+    _tables_ensured: set = set()
+    _gsis_ensured: set = set()
+
+    def __init__(self, table_name: str = None, projection: List[str] = None):
         """
         Initialize DynamoDB connection.
         If table_name is not provided, it looks for DYNAMODB_TABLE env var.
+        `projection` overrides the attributes metric reads fetch (defaults to METRICS_PROJECTION).
         """
-        # Explicitly pass credentials to ensure they are picked up from env
-        self.dynamodb = boto3.resource(
-            'dynamodb',
-            region_name=os.getenv("AWS_REGION", "us-east-1"),
-            aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-            aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
-        )
+        # Shared resource; .Table() is just a cheap local handle
+        self.dynamodb = _DDB_RESOURCE
         self.table_name = table_name or os.getenv("DYNAMODB_TABLE")
+        self.projection = tuple(projection) if projection else self.METRICS_PROJECTION
         
         if self.table_name:
             self.table = self.dynamodb.Table(self.table_name)
@@ -23,33 +64,27 @@ class DynamoDB:
             self.table = None
             print("Warning: Database initialized without a table_name.")
 
-    def write_campaign_metrics(self, campaign_id: str, range_days: int, metrics: Dict[str, Any]):
+    def write_campaign_metrics(self, campaign_id: str, range_days: int, metrics: Dict[str, Any], timestamp: str = None):
         """
-        Stores campaign metrics (for Dash). Single item write with retry.
+        Stores campaign metrics (for Dash). Single item write.
+        Callers writing in a loop should compute `timestamp` once and pass it in.
         """
         import datetime
-        import time
         
         item = {
             'campaign_id': str(campaign_id),
             'range_days': int(range_days),
-            'last_synced': datetime.datetime.utcnow().isoformat(),
+            'last_synced': timestamp or datetime.datetime.now(datetime.timezone.utc).isoformat(),
             **metrics
         }
         
-        for attempt in range(5):
-            try:
-                self.table.put_item(Item=item)
-                return True
-            except Exception as e:
-                if 'ProvisionedThroughputExceededException' in str(e):
-                    wait_time = (2 ** attempt) * 0.1  # 0.1s, 0.2s, 0.4s, 0.8s, 1.6s
-                    print(f"Throughput exceeded, waiting {wait_time}s...")
-                    time.sleep(wait_time)
-                else:
-                    print(f"Error storing to {self.table_name}: {str(e)}")
-                    return False
-        return False
+        # Throttling retries are handled by the SDK (adaptive retry mode)
+        try:
+            self.table.put_item(Item=item)
+            return True
+        except Exception as e:
+            print(f"Error storing to {self.table_name}: {str(e)}")
+            return False
 
     def batch_write_campaign_metrics(self, campaigns: List[Dict[str, Any]], range_days: int):
         """
@@ -57,117 +92,222 @@ class DynamoDB:
         Much faster than individual writes.
         """
         import datetime
-        import time
         
         if not campaigns:
             return True
             
-        timestamp = datetime.datetime.utcnow().isoformat()
+        timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
         
-        # Prepare items
-        items = []
+        # Prepare items. BatchWriteItem rejects duplicate keys within a request, last one wins
+        items = {}
         for campaign in campaigns:
             campaign_id = campaign.get("campaign_id")
             if campaign_id:
                 metrics = {k: v for k, v in campaign.items() if k != "campaign_id"}
-                items.append({
+                items[str(campaign_id)] = {
                     'campaign_id': str(campaign_id),
                     'range_days': int(range_days),
                     'last_synced': timestamp,
                     **metrics
-                })
+                }
+        items = list(items.values())
         
-        # DynamoDB batch_write_item supports max 25 items per batch
-        batch_size = 25
-        for i in range(0, len(items), batch_size):
-            batch = items[i:i + batch_size]
-            
-            for attempt in range(5):
-                try:
-                    with self.table.batch_writer() as writer:
-                        for item in batch:
-                            writer.put_item(Item=item)
-                    break  # Success, move to next batch
-                except Exception as e:
-                    if 'ProvisionedThroughputExceededException' in str(e):
-                        wait_time = (2 ** attempt) * 0.2
-                        print(f"Throughput exceeded on batch, waiting {wait_time}s...")
-                        time.sleep(wait_time)
-                    else:
-                        print(f"Batch write error: {str(e)}")
-                        break
+        # DynamoDB batch_write_item supports max 25 items per batch.
+        # Chunks are independent, so overlap their round trips on the shared write pool.
+        batch_size = self.BATCH_WRITE_LIMIT
+        batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+        futures = [_WRITE_EXECUTOR.submit(self._write_chunk, batch) for batch in batches]
+        dropped = sum(future.result() for future in concurrent.futures.as_completed(futures))
         
+        if dropped:
+            print(f"Batch write: {dropped}/{len(items)} campaigns not written for {range_days} days")
+            return False
         print(f"Batch wrote {len(items)} campaigns for {range_days} days")
         return True
 
+    def _write_chunk(self, batch: List[Dict[str, Any]]) -> int:
+        """
+        Writes up to 25 items with a single BatchWriteItem call.
+        Items DynamoDB hands back as UnprocessedItems are resubmitted with backoff.
+        Returns how many items were left unwritten (0 on success).
+        """
+        import time
+        
+        client = self.table.meta.client
+        request_items = {self.table_name: [{'PutRequest': {'Item': item}} for item in batch]}
+        
+        # One initial attempt plus up to 7 retries
+        for attempt in range(8):
+            try:
+                response = client.batch_write_item(RequestItems=request_items)
+            except Exception as e:
+                # Throttled requests were already retried by the SDK
+                print(f"Batch write error: {str(e)}")
+                return len(request_items[self.table_name])
+            
+            unprocessed = response.get('UnprocessedItems', {})
+            if not unprocessed.get(self.table_name):
+                return 0
+            
+            # Only the leftovers are retried, already-written items aren't rewritten
+            request_items = unprocessed
+            wait_time = _backoff(attempt)
+            print(f"{len(unprocessed[self.table_name])} unprocessed items, retrying in {wait_time:.2f}s...")
+            time.sleep(wait_time)
+        
+        left = len(request_items[self.table_name])
+        print(f"Batch write gave up with {left} unprocessed items")
+        return left
+
+    # Attributes the dashboard actually renders; everything else stays in DynamoDB
+    METRICS_PROJECTION = (
+        'campaign_id', 'campaign_name', 'spend', 'account_name', 'platform',
+        'website_purchase_roas', 'action_values', 'actions'
+    )
+
+    @staticmethod
+    def _projection(fields) -> Dict[str, Any]:
+        """
+        Builds ProjectionExpression kwargs. Every name goes through a placeholder
+        so attributes that collide with DynamoDB reserved words are safe.
+        """
+        names = {f"#p{i}": field for i, field in enumerate(fields)}
+        return {
+            'ProjectionExpression': ", ".join(names),
+            'ExpressionAttributeNames': names
+        }
+
+    def iter_campaign_metrics(self, range_days: int):
+        """
+        Yields campaign metrics for a time range using GSI query, one page at a time.
+        Only the projected attributes are fetched, which cuts RCU and bytes on the wire.
+        """
+        from boto3.dynamodb.conditions import Key
+        
+        query_kwargs = {
+            'IndexName': 'RangeDaysIndex',
+            'KeyConditionExpression': Key('range_days').eq(int(range_days)),
+            **self._projection(self.projection)
+        }
+        response = self.table.query(**query_kwargs)
+        yield from response.get('Items', [])
+        
+        # Handle pagination if more than 1MB of data
+        while 'LastEvaluatedKey' in response:
+            response = self.table.query(ExclusiveStartKey=response['LastEvaluatedKey'], **query_kwargs)
+            yield from response.get('Items', [])
+
+    def _query_range(self, range_days: int):
+        """GSI query for one range. Returns None if it failed, so callers can tell that from no rows."""
+        try:
+            return list(self.iter_campaign_metrics(range_days))
+        except Exception as e:
+            # No silent full-table scan on every dashboard request: surface the missing GSI instead
+            print(f"❌ GSI query on {self.table_name} failed, returning no rows (is RangeDaysIndex ACTIVE?): {e}")
+            return None
+
     def read_campaign_metrics(self, range_days: int) -> List[Dict[str, Any]]:
         """
         Reads all campaign metrics for a specific time range using GSI query.
         Significantly faster than table scan (~10-30ms vs 2-3s).
         """
+        rows = self._query_range(range_days)
+        return [] if rows is None else rows
+
+    def read_campaign_metrics_multi(self, days_list: List[int]) -> Dict[int, Optional[List[Dict[str, Any]]]]:
+        """
+        Reads several time ranges at once, keyed by range_days.
+        A Query can't match more than one hash key, so each range is its own GSI query, run in parallel.
+        A range whose query failed maps to None rather than an empty list.
+        """
+        if not days_list:
+            return {}
+        if len(days_list) == 1:
+            return {days_list[0]: self._query_range(days_list[0])}
+        return dict(zip(days_list, _READ_EXECUTOR.map(self._query_range, days_list)))
+
+    def range_days_index_status(self):
+        """
+        Returns the IndexStatus of RangeDaysIndex ('CREATING', 'ACTIVE', ...), or None if it doesn't exist.
+        """
         try:
-            from boto3.dynamodb.conditions import Key
-            
-            response = self.table.query(
-                IndexName='RangeDaysIndex',
-                KeyConditionExpression=Key('range_days').eq(int(range_days))
-            )
-            
-            items = response.get('Items', [])
-            
-            # Handle pagination if more than 1MB of data
-            while 'LastEvaluatedKey' in response:
-                response = self.table.query(
-                    IndexName='RangeDaysIndex',
-                    KeyConditionExpression=Key('range_days').eq(int(range_days)),
-                    ExclusiveStartKey=response['LastEvaluatedKey']
-                )
-                items.extend(response.get('Items', []))
-            
-            return items
+            table_desc = self.table.meta.client.describe_table(TableName=self.table_name)
         except Exception as e:
-            # Fallback to scan if GSI doesn't exist yet
-            print(f"GSI query failed, falling back to scan: {e}")
-            from boto3.dynamodb.conditions import Attr
-            response = self.table.scan(
-                FilterExpression=Attr('range_days').eq(int(range_days))
-            )
-            return response.get('Items', [])
-    def save_integration(self, platform: str, account_id: str, email: str, access_token: str, account_name: str = None, status: str = "Active", last_synced: str = None):
+            print(f"Error describing {self.table_name}: {e}")
+            return None
+        for gsi in table_desc.get('Table', {}).get('GlobalSecondaryIndexes', []):
+            if gsi['IndexName'] == 'RangeDaysIndex':
+                return gsi.get('IndexStatus')
+        return None
+
+    @staticmethod
+    def _integration_item(platform: str, account_id: str, email: str, access_token: str, account_name: str = None, status: str = "Active", last_synced: str = None, discovered_ids: List[str] = None) -> Dict[str, Any]:
+        import datetime
+        item = {
+            'platform': platform,
+            'account_id': str(account_id),
+            'email': email,
+            'access_token': access_token,
+            'account_name': account_name or account_id,
+            'status': status,
+            'last_synced': last_synced or datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+        }
+        # Customer IDs found under an email-keyed Google login, so restarts can skip discovery
+        if discovered_ids:
+            item['discovered_ids'] = [str(i) for i in discovered_ids]
+        return item
+
+    def save_integration(self, platform: str, account_id: str, email: str, access_token: str, account_name: str = None, status: str = "Active", last_synced: str = None, discovered_ids: List[str] = None):
         """
         Stores account integration details.
         """
         try:
-            import datetime
-            item = {
-                'platform': platform,
-                'account_id': str(account_id),
-                'email': email,
-                'access_token': access_token,
-                'account_name': account_name or account_id,
-                'status': status,
-                'last_synced': last_synced or datetime.datetime.utcnow().isoformat()
-            }
+            item = self._integration_item(platform, account_id, email, access_token, account_name, status, last_synced, discovered_ids)
             self.table.put_item(Item=item)
             return True
         except Exception as e:
             print(f"Error saving integration: {str(e)}")
             return False
 
-    def list_integrations(self, platform: str = None) -> List[Dict[str, Any]]:
+    def batch_save_integrations(self, integrations: List[Dict[str, Any]]) -> int:
+        """
+        Stores many integrations with BatchWriteItem (25 per call) instead of one PutItem each.
+        Each entry takes the same keyword fields as save_integration.
+        Returns the number of (distinct) integrations that could not be written.
+        """
+        if not integrations:
+            return 0
+        
+        # BatchWriteItem rejects duplicate keys within a request, last one wins
+        items = {}
+        for integration in integrations:
+            item = self._integration_item(**integration)
+            items[(item['platform'], item['account_id'])] = item
+        items = list(items.values())
+        
+        batch_size = self.BATCH_WRITE_LIMIT
+        return sum(self._write_chunk(items[i:i + batch_size]) for i in range(0, len(items), batch_size))
+
+    # Integration attributes safe to return without the (large) encrypted token
+    INTEGRATION_PROJECTION = ('platform', 'account_id', 'email', 'account_name', 'status', 'last_synced')
+
+    def list_integrations(self, platform: str = None, include_tokens: bool = False) -> List[Dict[str, Any]]:
         """
         Lists all integrations, optionally filtered by platform.
+        access_token is only fetched when include_tokens is True (sync workers, OAuth refresh).
         """
         try:
+            projection = {} if include_tokens else self._projection(self.INTEGRATION_PROJECTION)
             if platform:
                 # Assuming 'platform' is the partition key for an Integrations table
                 # Or we can just scan if the table is small
                 response = self.table.query(
                     KeyConditionExpression="platform = :p",
-                    ExpressionAttributeValues={":p": platform}
+                    ExpressionAttributeValues={":p": platform},
+                    **projection
                 )
             else:
-                response = self.table.scan()
+                response = self.table.scan(**projection)
             return response.get('Items', [])
         except Exception as e:
             print(f"Error listing integrations: {str(e)}")
@@ -178,10 +318,17 @@ class DynamoDB:
         Creates the table if it doesn't exist.
         Default PK is campaign_id (S), SK is range_days (N).
         """
+        if self.table_name in DynamoDB._tables_ensured:
+            return True
         try:
-            existing_tables = [t.name for t in self.dynamodb.tables.all()]
-            if self.table_name in existing_tables:
+            # O(1) existence check instead of listing every table in the account
+            client = self.dynamodb.meta.client
+            try:
+                client.describe_table(TableName=self.table_name)
+                DynamoDB._tables_ensured.add(self.table_name)
                 return True
+            except client.exceptions.ResourceNotFoundException:
+                pass
                 
             print(f"Creating table {self.table_name}...")
             table = self.dynamodb.create_table(
@@ -198,6 +345,7 @@ class DynamoDB:
             )
             table.meta.client.get_waiter('table_exists').wait(TableName=self.table_name)
             self.table = self.dynamodb.Table(self.table_name)
+            DynamoDB._tables_ensured.add(self.table_name)
             return True
         except Exception as e:
             print(f"Error creating table: {str(e)}")
@@ -208,6 +356,8 @@ class DynamoDB:
         Creates a GSI on range_days for efficient querying by time range.
         This replaces expensive table scans with fast queries.
         """
+        if self.table_name in DynamoDB._gsis_ensured:
+            return True
         try:
             # Check if GSI already exists
             table_desc = self.table.meta.client.describe_table(TableName=self.table_name)
@@ -215,6 +365,7 @@ class DynamoDB:
             
             if any(gsi['IndexName'] == 'RangeDaysIndex' for gsi in existing_gsis):
                 print(f"✅ GSI 'RangeDaysIndex' already exists on {self.table_name}")
+                DynamoDB._gsis_ensured.add(self.table_name)
                 return True
                 
             # Create GSI
@@ -231,7 +382,13 @@ class DynamoDB:
                             {'AttributeName': 'range_days', 'KeyType': 'HASH'},
                             {'AttributeName': 'campaign_id', 'KeyType': 'RANGE'}
                         ],
-                        'Projection': {'ProjectionType': 'ALL'},
+                        # Only the attributes reads project, so the index stays small
+                        'Projection': {
+                            'ProjectionType': 'INCLUDE',
+                            'NonKeyAttributes': [
+                                f for f in self.projection if f not in ('campaign_id', 'range_days')
+                            ]
+                        },
                         'ProvisionedThroughput': {
                             'ReadCapacityUnits': 15,
                             'WriteCapacityUnits': 15
@@ -241,6 +398,7 @@ class DynamoDB:
             )
             
             print(f"✅ GSI 'RangeDaysIndex' created. Building in background (5-10 min)...")
+            DynamoDB._gsis_ensured.add(self.table_name)
             return True
         except Exception as e:
             print(f"Error creating GSI: {e}")
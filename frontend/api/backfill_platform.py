@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+One-shot migration: stamps `platform` on metrics rows written before it was
+stored at write time, so reads can return rows as-is.
+Safe to re-run; only rows missing the attribute are touched.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+# Load global.env before the shared DynamoDB resource is built
+from utils.config import get_config
+get_config()
+
+from boto3.dynamodb.conditions import Attr
+from Database.database import DynamoDB
+
+TABLE_PLATFORMS = {
+    "MetaAdsInsights": "meta",
+    "GoogleAdsInsights": "google",
+}
+
+def backfill_platform():
+    for table_name, platform in TABLE_PLATFORMS.items():
+        table = DynamoDB(table_name=table_name).table
+        scan_kwargs = {
+            'FilterExpression': Attr('platform').not_exists(),
+            'ProjectionExpression': 'campaign_id, range_days',
+        }
+        updated = 0
+        while True:
+            response = table.scan(**scan_kwargs)
+            for item in response.get('Items', []):
+                table.update_item(
+                    Key={'campaign_id': item['campaign_id'], 'range_days': item['range_days']},
+                    UpdateExpression='SET #pl = :p',
+                    ExpressionAttributeNames={'#pl': 'platform'},
+                    ExpressionAttributeValues={':p': platform}
+                )
+                updated += 1
+            if 'LastEvaluatedKey' not in response:
+                break
+            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        print(f"✅ {table_name}: set platform='{platform}' on {updated} rows.")
+
+if __name__ == "__main__":
+    backfill_platform()
@@ -6,6 +6,8 @@ Run this script to check when the performance optimization is ready.
 import sys
 import os
 import time
+import ctypes
+from collections import deque
 
 sys.path.insert(0, '/Users/rmm/CUBE/CUBE-ARP/backend')
 
@@ -13,31 +15,122 @@ from dotenv import load_dotenv
 load_dotenv('/Users/rmm/CUBE/CUBE-ARP/global.env', override=True)
 
 import boto3
+from botocore.config import Config
 
 def check_gsi_status():
     dynamodb = boto3.client(
         'dynamodb',
         region_name=os.getenv("AWS_REGION", "us-east-1"),
         aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
+        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+        config=Config(
+            max_pool_connections=64,
+            retries={'max_attempts': 10, 'mode': 'adaptive'},
+            connect_timeout=3,
+            read_timeout=10,
+            tcp_keepalive=True
+        )
     )
     
     response = dynamodb.describe_table(TableName='MetaAdsInsights')
-    gsis = response.get('Table', {}).get('GlobalSecondaryIndexes', [])
+    table = response.get('Table', {})
+    table_item_count = table.get('ItemCount', 0)
+    gsis = table.get('GlobalSecondaryIndexes', [])
     
     for gsi in gsis:
         if gsi['IndexName'] == 'RangeDaysIndex':
-            return gsi.get('IndexStatus', 'UNKNOWN'), gsi.get('ItemCount', 0)
+            return gsi.get('IndexStatus', 'UNKNOWN'), gsi.get('ItemCount', 0), table_item_count
     
-    return None, 0
+    return None, 0, table_item_count
+
+# Poll interval bounds (seconds). Polls are packed near the expected finish
+# and stretched while the backfill is still far from done.
+MIN_POLL_SECONDS = 10
+MAX_POLL_SECONDS = 60
+# Without a progress signal the delay backs off from MIN_POLL_SECONDS, but never past the old
+# fixed 30s interval, so detection is never slower than before
+NO_SIGNAL_MAX_POLL_SECONDS = 30
+# Number of (timestamp, ItemCount) samples used to estimate backfill speed
+HISTORY_SIZE = 5
+
+def next_poll_interval(history, table_item_count: int, previous: int = None) -> int:
+    """
+    Picks the next poll delay from ItemCount velocity.
+    - Index ~90% of the base table: poll tight.
+    - No progress signal (DescribeTable's ItemCount only refreshes ~every 6 hours, so this is
+      the usual case): start at MIN_POLL_SECONDS and double up to NO_SIGNAL_MAX_POLL_SECONDS.
+    - Otherwise wait about half of the estimated time left, within the bounds.
+    """
+    backoff = MIN_POLL_SECONDS if previous is None else min(NO_SIGNAL_MAX_POLL_SECONDS, previous * 2)
+    if not history:
+        return backoff
+    c1 = history[-1][1]
+    if table_item_count and c1 >= 0.9 * table_item_count:
+        return MIN_POLL_SECONDS
+    if len(history) < 2:
+        return backoff
+    t0, c0 = history[0]
+    t1 = history[-1][0]
+    rate = (c1 - c0) / (t1 - t0) if t1 > t0 else 0
+    if rate <= 0 or not table_item_count:
+        return backoff
+    eta = (table_item_count - c1) / rate
+    return int(max(MIN_POLL_SECONDS, min(MAX_POLL_SECONDS, eta / 2)))
+
+CLOCK_MONOTONIC = 1
+
+class _Timespec(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+class _Itimerspec(ctypes.Structure):
+    _fields_ = [("it_interval", _Timespec), ("it_value", _Timespec)]
+
+class PollTimer:
+    """
+    Periodic timer backed by a Linux timerfd (CLOCK_MONOTONIC), so ticks don't drift
+    the way chained time.sleep calls do. Falls back to time.sleep elsewhere.
+    """
+    def __init__(self):
+        self.fd = None
+        self.interval = None
+        if not sys.platform.startswith("linux"):
+            return
+        try:
+            self.libc = ctypes.CDLL(None, use_errno=True)
+            fd = self.libc.timerfd_create(CLOCK_MONOTONIC, 0)
+            if fd >= 0:
+                self.fd = fd
+        except (OSError, AttributeError):
+            self.fd = None
+
+    def wait(self, seconds: int):
+        """Blocks until the next tick, re-arming only when the interval changes."""
+        if self.fd is None:
+            time.sleep(seconds)
+            return
+        if seconds != self.interval:
+            spec = _Itimerspec(_Timespec(seconds, 0), _Timespec(seconds, 0))
+            if self.libc.timerfd_settime(self.fd, 0, ctypes.byref(spec), None) != 0:
+                time.sleep(seconds)
+                return
+            self.interval = seconds
+        os.read(self.fd, 8)  # number of expirations, we only care that one happened
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
 
 if __name__ == "__main__":
     print("🔍 Monitoring RangeDaysIndex GSI creation...\n")
     
     watch = "--watch" in sys.argv
+    timer = PollTimer()
+    history = deque(maxlen=HISTORY_SIZE)
+    interval = None
     
     while True:
-        status, item_count = check_gsi_status()
+        status, item_count, table_item_count = check_gsi_status()
         
         timestamp = time.strftime("%H:%M:%S")
         
@@ -58,5 +151,9 @@ if __name__ == "__main__":
             print("  python check_gsi_status.py --watch")
             break
         
-        time.sleep(30)  # Check every 30 seconds
+        history.append((time.monotonic(), item_count))
+        interval = next_poll_interval(history, table_item_count, interval)
+        timer.wait(interval)
+    
+    timer.close()
 
@@ -1,55 +1,61 @@
+import asyncio
+import concurrent.futures
+import hashlib
 import os
 import sys
+import threading
+import time
 
 # Ensure the current directory is in the path for finding siblings like 'meta', 'google', 'Database'
 sys.path.append(os.path.dirname(__file__))
 
-from meta.meta_curl import fetch_and_store, fetch_and_store_all, get_cached_insights as get_meta_insights
-from google_ads_custom.google_curl import fetch_and_store as fetch_google, fetch_and_store_all as fetch_google_all, get_cached_insights as get_google_insights, discover_accounts
-from Database.database import DynamoDB
-from dotenv import load_dotenv
+# Load environment variables (Local only) and OAuth/CORS settings, once per process
+from utils.config import get_config
+CFG = get_config()
 
-# Load environment variables (Local only)
-ENV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'global.env')
-if os.path.exists(ENV_PATH):
-    load_dotenv(ENV_PATH, override=True)
+from meta.meta_curl import fetch_and_store_all, get_cached_insights_multi as get_meta_insights_multi
+from google_ads_custom.google_curl import fetch_and_store_all as fetch_google_all, get_cached_insights_multi as get_google_insights_multi, discover_accounts
+from Database.database import DynamoDB
 
 from utils.security import encrypt_token
 from utils.sync_tracker import SyncTracker
 
-from fastapi import FastAPI, HTTPException, Query, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Query, Response
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Optional
 from contextlib import asynccontextmanager
+import orjson
 import requests
 import urllib.parse
-
-# Meta OAuth Configuration
-META_CLIENT_ID = os.getenv("META_CLIENT_ID", "").replace('"', '').replace("'", "").strip()
-META_CLIENT_SECRET = os.getenv("META_CLIENT_SECRET", "").replace('"', '').replace("'", "").strip()
-META_REDIRECT_URI = os.getenv("META_REDIRECT_URI", "http://localhost:8000/api/auth/meta/callback").replace('"', '').replace("'", "").strip()
-
-# Google OAuth Configuration
-GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID", "").replace('"', '').replace("'", "").strip()
-GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET", "").replace('"', '').replace("'", "").strip()
-GOOGLE_REDIRECT_URI = os.getenv("GOOGLE_REDIRECT_URI", "http://localhost:8000/api/auth/google/callback").replace('"', '').replace("'", "").strip()
-GOOGLE_DEVELOPER_TOKEN = os.getenv("GOOGLE_DEVELOPER_TOKEN", "").replace('"', '').replace("'", "").strip()
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# One pooled session for the OAuth calls, so graph.facebook.com / googleapis.com
+# connections are kept alive between requests instead of re-handshaking each time
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=20,
+    pool_maxsize=50,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504))
+))
 
 print(f"--- OAUTH CONFIG DIAGNOSTICS ---")
-print(f"META_CLIENT_ID: {META_CLIENT_ID}")
-print(f"META_REDIRECT_URI: {META_REDIRECT_URI}")
-print(f"GOOGLE_CLIENT_ID: {GOOGLE_CLIENT_ID}")
-print(f"GOOGLE_REDIRECT_URI: {GOOGLE_REDIRECT_URI}")
-print(f"GOOGLE_DEVELOPER_TOKEN: {'SET' if GOOGLE_DEVELOPER_TOKEN else 'MISSING'}")
+print(f"META_CLIENT_ID: {CFG.meta_client_id}")
+print(f"META_REDIRECT_URI: {CFG.meta_redirect_uri}")
+print(f"GOOGLE_CLIENT_ID: {CFG.google_client_id}")
+print(f"GOOGLE_REDIRECT_URI: {CFG.google_redirect_uri}")
+print(f"GOOGLE_DEVELOPER_TOKEN: {'SET' if CFG.google_developer_token else 'MISSING'}")
 print(f"----------------------------------")
 
 
 
 
-# Global references for lazy init
+# Global references, set by init_db_logic at startup
 integrations_db = None
 sync_tracker = None
 db_initialized = False
+_db_init_lock = threading.Lock()
 
 def init_db_logic():
     global integrations_db, sync_tracker
@@ -71,20 +77,63 @@ def init_db_logic():
     google_metrics_db.create_table(pk='campaign_id', sk='range_days', sk_type='N')
     google_metrics_db.create_range_days_gsi()
 
+def ensure_db():
+    """
+    Runs init_db_logic once per process. The lifespan hook calls it at startup; endpoints
+    call it too, for deployments (e.g. serverless) that never run ASGI lifespan.
+    """
+    global db_initialized
+    if db_initialized:
+        return
+    with _db_init_lock:
+        if not db_initialized:
+            init_db_logic()
+            db_initialized = True
+
+# Syncs run on a small dedicated pool. While one is in flight, new sync requests
+# are turned away instead of stacking duplicate multi-range syncs on the APIs and DB.
+_SYNC_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="sync")
+_sync_inflight = threading.Lock()
+
+def submit_sync(task, reserve=None) -> bool:
+    """
+    Runs task on the sync pool. Returns False without running it if a sync is already in flight.
+    `reserve` runs once no other sync is in flight, before the task is queued; if it raises,
+    the task doesn't run and the error propagates.
+    """
+    if not _sync_inflight.acquire(blocking=False):
+        return False
+    if reserve is not None:
+        try:
+            reserve()
+        except BaseException:
+            _sync_inflight.release()
+            raise
+
+    def run():
+        try:
+            task()
+        except Exception as e:
+            print(f"SYNC TASK FAILED: {e}")
+        finally:
+            _sync_inflight.release()
+
+    _SYNC_EXECUTOR.submit(run)
+    return True
+
 def cleanup():
     print("Shutting down...")
+    _SYNC_EXECUTOR.shutdown(wait=False, cancel_futures=True)
 
-# app = FastAPI(lifespan=lifespan)
-app = FastAPI()
-
-# Database initialization state
-db_initialized = False
+@asynccontextmanager
+async def lifespan(app):
+    # Create tables before the first request when the server runs lifespan
+    ensure_db()
+    yield
+    cleanup()
 
-def ensure_db():
-    global db_initialized
-    if not db_initialized:
-        init_db_logic()
-        db_initialized = True
+# orjson serializes the large insights payloads several times faster than stdlib json
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 @app.middleware("http")
 async def catch_exceptions_middleware(request, call_next):
@@ -100,28 +149,8 @@ async def catch_exceptions_middleware(request, call_next):
             content={"detail": "Internal Server Error", "error": str(e), "traceback": traceback.format_exc()}
         )
 
-from fastapi.middleware.cors import CORSMiddleware
-
-# CORS configuration
-FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000").replace('"', '').replace("'", "").strip()
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "http://localhost:3000", 
-        "http://127.0.0.1:3000",
-        FRONTEND_URL
-    ],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Removed redundant ensure_db definition
-
 @app.get("/api/")
 def health_check():
-    ensure_db()
     return {"status": "ok", "message": "Backend is running"}
 
 # import threading
@@ -135,34 +164,196 @@ class IntegrationRequest(BaseModel):
     access_token: str
 
 
-from meta.meta_curl import fetch_and_store, fetch_and_store_all, get_cached_insights
+# Insights only change when a sync runs, so dashboard polls share one DynamoDB
+# read per (platform, range) for INSIGHTS_CACHE_SECONDS. Syncs clear the cache.
+INSIGHTS_CACHE_SECONDS = 60
+INSIGHTS_CACHE_MAX_ENTRIES = 32
+_insights_cache = {}  # (platform, days) -> (expires_at, rows)
+_insights_cache_lock = threading.Lock()
+# Bumped by every invalidation. A read that started before a sync finished must not
+# store its (pre-sync) result once the cache has been cleared.
+_insights_generation = 0
+
+def cached_insights_multi(platform: str, days_list):
+    """
+    Returns ({days: rows}, complete) for a platform, served from memory when fresh.
+    Missing ranges are read together in one parallel batch. A range whose read failed
+    comes back empty, isn't cached, and makes `complete` False.
+    """
+    now = time.monotonic()
+    result = {}
+    with _insights_cache_lock:
+        generation = _insights_generation
+        for days in days_list:
+            hit = _insights_cache.get((platform, days))
+            if hit and hit[0] > now:
+                result[days] = hit[1]
+
+    missing = [days for days in days_list if days not in result]
+    if missing:
+        fetch = get_meta_insights_multi if platform == "meta" else get_google_insights_multi
+        fresh = fetch(missing)
+        failed = [days for days, rows in fresh.items() if rows is None]
+        fresh = {days: rows for days, rows in fresh.items() if rows is not None}
+        with _insights_cache_lock:
+            if generation == _insights_generation:
+                # `range` comes from the query string, so keep the key space bounded
+                if len(_insights_cache) + len(fresh) > INSIGHTS_CACHE_MAX_ENTRIES:
+                    _insights_cache.clear()
+                for days, rows in fresh.items():
+                    _insights_cache[(platform, days)] = (now + INSIGHTS_CACHE_SECONDS, rows)
+        result.update(fresh)
+        result.update((days, []) for days in failed)
+        return result, not failed
+    return result, True
+
+def cached_insights(platform: str, days: int):
+    """Returns (rows, complete) for a platform/range, served from memory when fresh."""
+    result, complete = cached_insights_multi(platform, [days])
+    return result[days], complete
+
+def invalidate_insights_cache():
+    """Drops every cached entry so the next read sees freshly synced data."""
+    global _insights_generation
+    with _insights_cache_lock:
+        _insights_generation += 1
+        _insights_cache.clear()
+        _insights_etags.clear()
+
+# Insights are only served from a metrics table once its RangeDaysIndex is ACTIVE.
+# Once it is, it stays that way, so that table is never checked again. Any other
+# answer is remembered for INDEX_RECHECK_SECONDS so polls don't each call DescribeTable.
+INSIGHTS_TABLES = {"meta": "MetaAdsInsights", "google": "GoogleAdsInsights"}
+INDEX_RECHECK_SECONDS = 15
+_index_ready = set()      # platforms whose index is ACTIVE
+_index_not_ready = {}     # platform -> (recheck_at, status)
+
+def range_days_index_status(platform: str):
+    """Returns the RangeDaysIndex status for a platform's metrics table, cached."""
+    if platform in _index_ready:
+        return 'ACTIVE'
+    now = time.monotonic()
+    hit = _index_not_ready.get(platform)
+    if hit and hit[0] > now:
+        return hit[1]
+    status = DynamoDB(table_name=INSIGHTS_TABLES[platform]).range_days_index_status()
+    if status == 'ACTIVE':
+        _index_ready.add(platform)
+        _index_not_ready.pop(platform, None)
+    else:
+        _index_not_ready[platform] = (now + INDEX_RECHECK_SECONDS, status)
+    return status
+
+def ensure_insights_ready(platforms=("meta", "google")) -> list:
+    """
+    Returns the platforms whose index is ACTIVE. Each table is checked on its own,
+    so one still building doesn't block the other; 503 only if none is ready.
+    """
+    ensure_db()
+    statuses = {platform: range_days_index_status(platform) for platform in platforms}
+    ready = [platform for platform, status in statuses.items() if status == 'ACTIVE']
+    if ready:
+        return ready
+    raise HTTPException(
+        status_code=503,
+        detail={
+            "message": "Insights index is still building. Please try again shortly.",
+            "index_status": {INSIGHTS_TABLES[platform]: status for platform, status in statuses.items()}
+        }
+    )
+
+# Browsers must revalidate every poll (data changes right after a sync), but an unchanged
+# response costs only a bodyless 304 thanks to the ETag
+INSIGHTS_CACHE_CONTROL = "private, no-cache"
+# Sent instead when a read failed, so neither the browser nor the ETag cache keeps the partial body
+INSIGHTS_NO_STORE = "no-store"
+INSIGHTS_ETAG_PATHS = ("/api/insights", "/api/insights/all")
+_insights_etags = {}  # request URL -> (expires_at, etag)
+
+@app.middleware("http")
+async def insights_etag_middleware(request, call_next):
+    """
+    Tags insights responses with a weak ETag and answers matching
+    If-None-Match polls with a bodyless 304.
+    """
+    if request.method != "GET" or request.url.path not in INSIGHTS_ETAG_PATHS:
+        return await call_next(request)
+
+    key = str(request.url)
+    if_none_match = request.headers.get("if-none-match")
+    now = time.monotonic()
+    hit = _insights_etags.get(key)
+    if if_none_match and hit and hit[0] > now and hit[1] == if_none_match:
+        # Nothing was synced since this ETag was issued, so skip the handler entirely
+        return Response(status_code=304, headers={"ETag": hit[1], "Cache-Control": INSIGHTS_CACHE_CONTROL})
+
+    # An ETag computed from pre-sync data must not be stored after the sync cleared them
+    generation = _insights_generation
+    response = await call_next(request)
+    if response.status_code != 200 or response.headers.get("cache-control") == INSIGHTS_NO_STORE:
+        return response
+
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    etag = 'W/"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+    with _insights_cache_lock:
+        if generation == _insights_generation:
+            if len(_insights_etags) >= INSIGHTS_CACHE_MAX_ENTRIES:
+                _insights_etags.clear()
+            _insights_etags[key] = (now + INSIGHTS_CACHE_SECONDS, etag)
+
+    # Keep the handler's headers (Content-Type etc.); the body length is set again below
+    headers = {k: v for k, v in response.headers.items() if k.lower() != "content-length"}
+    headers["ETag"] = etag
+    headers["Cache-Control"] = INSIGHTS_CACHE_CONTROL
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": INSIGHTS_CACHE_CONTROL})
+    return Response(content=body, status_code=200, headers=headers, media_type="application/json")
+
+from fastapi.middleware.cors import CORSMiddleware
+
+# CORS configuration. Registered after the other middleware so it is the outermost
+# layer and its headers reach every response, including the ETag middleware's 304s.
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=[
+        "http://localhost:3000", 
+        "http://127.0.0.1:3000",
+        CFG.frontend_url
+    ],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
 
 @app.get("/api/insights")
-def get_insights(range: int = Query(7)):
+def get_insights(response: Response, range: int = Query(7)):
     """
     Returns cached data from DynamoDB. Does NOT trigger a Meta API fetch.
     """
-    return get_cached_insights(range)
+    ensure_insights_ready(("meta",))
+    rows, complete = cached_insights("meta", range)
+    response.headers["Cache-Control"] = INSIGHTS_CACHE_CONTROL if complete else INSIGHTS_NO_STORE
+    return rows
 
 @app.get("/api/insights/all")
-def get_all_insights():
+async def get_all_insights(response: Response):
     """
     Returns all ranges (7, 30, 180 days) for both Meta and Google.
+    Each platform reads its three ranges in one parallel batch, and both platforms run concurrently.
     """
-    ensure_db()
-    meta_7 = get_meta_insights(7)
-    meta_30 = get_meta_insights(30)
-    meta_180 = get_meta_insights(180)
+    ready = await asyncio.to_thread(ensure_insights_ready)
 
-    google_7 = get_google_insights(7)
-    google_30 = get_google_insights(30)
-    google_180 = get_google_insights(180)
+    ranges = (7, 30, 180)
+    # A platform whose index is still building contributes no rows for now
+    empty = ({d: [] for d in ranges}, True)
+    (meta, meta_complete), (google, google_complete) = await asyncio.gather(*(
+        asyncio.to_thread(cached_insights_multi, platform, ranges) if platform in ready else asyncio.sleep(0, empty)
+        for platform in ("meta", "google")
+    ))
+    complete = meta_complete and google_complete
+    response.headers["Cache-Control"] = INSIGHTS_CACHE_CONTROL if complete else INSIGHTS_NO_STORE
 
-    return {
-        "7": meta_7 + google_7,
-        "30": meta_30 + google_30,
-        "180": meta_180 + google_180
-    }
+    return {str(d): meta[d] + google[d] for d in ranges}
 
 @app.get("/api/insights/sync-status")
 def get_sync_status():
@@ -172,8 +363,20 @@ def get_sync_status():
     ensure_db()
     return sync_tracker.get_status()
 
+def sync_limit_reached(status: dict) -> HTTPException:
+    """429 for a full sync window, with the cooldown info the frontend shows."""
+    return HTTPException(
+        status_code=429,
+        detail={
+            "message": f"Sync limit reached ({status['max_syncs']}/{status['max_syncs']}). Please wait for cooldown.",
+            "syncs_remaining": 0,
+            "next_free_at": status["next_free_at"],
+            "cooldown_seconds_remaining": status["cooldown_seconds_remaining"],
+        }
+    )
+
 @app.post("/api/insights/sync")
-def trigger_sync(background_tasks: BackgroundTasks):
+def trigger_sync():
     """
     Triggers a fresh sync from Meta API and updates DynamoDB.
     Enforces a rate limit of MAX_SYNCS per COOLDOWN_HOURS window.
@@ -182,29 +385,30 @@ def trigger_sync(background_tasks: BackgroundTasks):
     status = sync_tracker.get_status()
 
     if not status["can_sync"]:
-        raise HTTPException(
-            status_code=429,
-            detail={
-                "message": f"Sync limit reached ({status['max_syncs']}/{status['max_syncs']}). Please wait for cooldown.",
-                "syncs_remaining": 0,
-                "next_free_at": status["next_free_at"],
-                "cooldown_seconds_remaining": status["cooldown_seconds_remaining"],
-            }
-        )
+        raise sync_limit_reached(status)
+
+    def reserve_slot():
+        # Claim the slot before the sync runs, so concurrent triggers can't slip past the limit
+        if not sync_tracker.record_sync():
+            raise sync_limit_reached(sync_tracker.get_status())
 
     def sync_with_tracking():
-        """Wrapper that records the sync timestamp on success."""
+        """Wrapper that runs both platform syncs and clears the insights cache on success."""
         print("SYNC TASK: Starting multi-platform sync...")
         try:
-            # Sync both platforms
-            fetch_and_store_all() # Meta
-            fetch_google_all()    # Google
-            sync_tracker.record_sync()
+            # Sync both platforms in parallel, they share nothing but the DB
+            with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+                meta_future = executor.submit(fetch_and_store_all)  # Meta
+                google_future = executor.submit(fetch_google_all)   # Google
+                meta_future.result()
+                google_future.result()
+            invalidate_insights_cache()
             print("SYNC TASK: Success.")
         except Exception as e:
             print(f"SYNC TASK FAILED: {e}")
 
-    background_tasks.add_task(sync_with_tracking)
+    if not submit_sync(sync_with_tracking, reserve=reserve_slot):
+        raise HTTPException(status_code=409, detail="Sync already in progress")
 
     return {
         "status": "started",
@@ -228,6 +432,7 @@ def list_integrations(platform: Optional[str] = None):
 
 @app.post("/api/integrations")
 def add_integration(req: IntegrationRequest):
+    ensure_db()
     success = integrations_db.save_integration(
         platform=req.platform,
         account_id=req.account_id,
@@ -242,14 +447,14 @@ def add_integration(req: IntegrationRequest):
 @app.get("/api/auth/meta/login")
 def meta_login():
     """Redirects to Facebook OAuth Dialog"""
-    if not META_CLIENT_ID:
+    if not CFG.meta_client_id:
         raise HTTPException(status_code=500, detail="META_CLIENT_ID not configured")
     
     # Business apps need real permissions to trigger the dialog
     scope = "email,ads_read"
     # Use safe='' to encode EVERYTHING including // and :
-    encoded_uri = urllib.parse.quote(META_REDIRECT_URI, safe='')
-    url = f"https://www.facebook.com/v21.0/dialog/oauth?client_id={META_CLIENT_ID}&redirect_uri={encoded_uri}&scope={scope}"
+    encoded_uri = urllib.parse.quote(CFG.meta_redirect_uri, safe='')
+    url = f"https://www.facebook.com/v21.0/dialog/oauth?client_id={CFG.meta_client_id}&redirect_uri={encoded_uri}&scope={scope}"
     print(f"DEBUG: Generated Meta OAuth URL: {url}")
     return {"url": url}
 
@@ -258,19 +463,20 @@ from fastapi.responses import RedirectResponse
 @app.get("/api/auth/meta/callback")
 def meta_callback(code: str):
     """Handles OAuth callback and exchanges code for long-lived token"""
+    ensure_db()
     if not code:
         raise HTTPException(status_code=400, detail="Code not provided")
 
     # 1. Exchange code for short-lived token
     token_url = "https://graph.facebook.com/v24.0/oauth/access_token"
     params = {
-        "client_id": META_CLIENT_ID,
-        "redirect_uri": META_REDIRECT_URI,
-        "client_secret": META_CLIENT_SECRET,
+        "client_id": CFG.meta_client_id,
+        "redirect_uri": CFG.meta_redirect_uri,
+        "client_secret": CFG.meta_client_secret,
         "code": code
     }
-    r = requests.get(token_url, params=params)
-    data = r.json()
+    r = SESSION.get(token_url, params=params)
+    data = orjson.loads(r.content)
     
     if "error" in data:
         return data
@@ -280,12 +486,12 @@ def meta_callback(code: str):
     # 2. Exchange for long-lived token (60 days)
     ll_params = {
         "grant_type": "fb_exchange_token",
-        "client_id": META_CLIENT_ID,
-        "client_secret": META_CLIENT_SECRET,
+        "client_id": CFG.meta_client_id,
+        "client_secret": CFG.meta_client_secret,
         "fb_exchange_token": short_token
     }
-    r_ll = requests.get(token_url, params=ll_params)
-    ll_data = r_ll.json()
+    r_ll = SESSION.get(token_url, params=ll_params)
+    ll_data = orjson.loads(r_ll.content)
     long_token = ll_data.get("access_token")
 
     if not long_token:
@@ -294,43 +500,49 @@ def meta_callback(code: str):
 
     # 3. Fetch Ad Accounts for this user
     accounts_url = f"https://graph.facebook.com/v24.0/me/adaccounts"
-    acc_r = requests.get(accounts_url, params={"access_token": long_token, "fields": "name,account_id"})
-    accounts = acc_r.json().get("data", [])
+    acc_r = SESSION.get(accounts_url, params={"access_token": long_token, "fields": "name,account_id"})
+    accounts = orjson.loads(acc_r.content).get("data", [])
 
     # 4. Save each account to Integrations table
-    user_info = requests.get("https://graph.facebook.com/me", params={"access_token": long_token, "fields": "email"}).json()
+    user_info = orjson.loads(SESSION.get("https://graph.facebook.com/me", params={"access_token": long_token, "fields": "email"}).content)
     user_email = user_info.get("email", "N/A")
 
-    for acc in accounts:
-        integrations_db.save_integration(
-            platform="meta",
-            account_id=acc["account_id"],
-            account_name=acc.get("name", f"Meta Account {acc['account_id']}"),
-            email=user_email,
-            access_token=encrypt_token(long_token)
-        )
-
-
-    # 5. Immediate sync for the new accounts
-    try:
+    # Same token for every account, so encrypt it once and write all rows in one batch
+    encrypted_token = encrypt_token(long_token)
+    integrations_db.batch_save_integrations([
+        {
+            "platform": "meta",
+            "account_id": acc["account_id"],
+            "account_name": acc.get("name", f"Meta Account {acc['account_id']}"),
+            "email": user_email,
+            "access_token": encrypted_token
+        }
+        for acc in accounts
+    ])
+
+
+    # 5. Immediate sync for the new accounts, run on the sync pool after the redirect
+    def post_login_sync():
         fetch_and_store_all()
-    except Exception as e:
-        print(f"Post-login sync failed: {e}")
+        invalidate_insights_cache()
+
+    if not submit_sync(post_login_sync):
+        print("META OAUTH: Sync already in progress, skipping post-login sync")
 
     # Redirect back to the frontend
-    return RedirectResponse(url=f"{FRONTEND_URL}/integrations?success=true&platform=meta")
+    return RedirectResponse(url=f"{CFG.frontend_url}/integrations?success=true&platform=meta")
 
 @app.get("/api/auth/google/login")
 def google_login():
     """Redirects to Google OAuth Dialog"""
-    if not GOOGLE_CLIENT_ID:
+    if not CFG.google_client_id:
         raise HTTPException(status_code=500, detail="GOOGLE_CLIENT_ID not configured")
     
     # Scopes for Google Ads and email
     scope = "https://www.googleapis.com/auth/adwords email openid"
     params = {
-        "client_id": GOOGLE_CLIENT_ID,
-        "redirect_uri": GOOGLE_REDIRECT_URI,
+        "client_id": CFG.google_client_id,
+        "redirect_uri": CFG.google_redirect_uri,
         "response_type": "code",
         "scope": scope,
         "access_type": "offline",
@@ -342,7 +554,7 @@ def google_login():
     return {"url": url}
 
 @app.get("/api/auth/google/callback")
-def google_callback(code: str, background_tasks: BackgroundTasks):
+def google_callback(code: str):
     """Handles Google OAuth callback and exchanges code for tokens"""
     ensure_db()
     if not code:
@@ -351,14 +563,14 @@ def google_callback(code: str, background_tasks: BackgroundTasks):
     # 1. Exchange code for tokens
     token_url = "https://oauth2.googleapis.com/token"
     payload = {
-        "client_id": GOOGLE_CLIENT_ID,
-        "client_secret": GOOGLE_CLIENT_SECRET,
-        "redirect_uri": GOOGLE_REDIRECT_URI,
+        "client_id": CFG.google_client_id,
+        "client_secret": CFG.google_client_secret,
+        "redirect_uri": CFG.google_redirect_uri,
         "grant_type": "authorization_code",
         "code": code
     }
-    r = requests.post(token_url, data=payload)
-    data = r.json()
+    r = SESSION.post(token_url, data=payload)
+    data = orjson.loads(r.content)
     
     if "error" in data:
         print(f"GOOGLE OAUTH ERROR: {data}")
@@ -368,9 +580,9 @@ def google_callback(code: str, background_tasks: BackgroundTasks):
     refresh_token = data.get("refresh_token") # Note: only provided on first consent or with prompt=consent
 
     # 2. Fetch User Email
-    user_info_r = requests.get("https://www.googleapis.com/oauth2/v3/userinfo", 
+    user_info_r = SESSION.get("https://www.googleapis.com/oauth2/v3/userinfo", 
                               params={"access_token": access_token})
-    user_info = user_info_r.json()
+    user_info = orjson.loads(user_info_r.content)
     user_email = user_info.get("email", "N/A")
 
     print(f"GOOGLE OAUTH: Received callback for {user_email}")
@@ -385,26 +597,37 @@ def google_callback(code: str, background_tasks: BackgroundTasks):
         print(f"GOOGLE OAUTH: No customer IDs discovered, saving {user_email} as fallback.")
         customer_ids = [user_email]
 
-    saved_count = 0
-    for cid in customer_ids:
-        success = integrations_db.save_integration(
-            platform="google",
-            account_id=cid,
-            account_name=f"Google Account ({cid})",
-            email=user_email,
-            access_token=encrypt_token(refresh_token or access_token)
-        )
-        if success:
-            saved_count += 1
-            print(f"GOOGLE OAUTH: Successfully saved integration for {cid}")
+    # Same token for every customer ID, so encrypt it once and write all rows in one batch
+    encrypted_token = encrypt_token(refresh_token or access_token)
+    unsaved = integrations_db.batch_save_integrations([
+        {
+            "platform": "google",
+            "account_id": cid,
+            "account_name": f"Google Account ({cid})",
+            "email": user_email,
+            "access_token": encrypted_token
+        }
+        for cid in customer_ids
+    ])
+    saved_count = len({str(cid) for cid in customer_ids}) - unsaved
+    if saved_count > 0:
+        print(f"GOOGLE OAUTH: Successfully saved {saved_count} integrations for {user_email}")
+    if unsaved:
+        print(f"GOOGLE OAUTH: {unsaved} integrations for {user_email} could not be saved")
 
     if saved_count > 0:
         # 4. Trigger asynchronous sync
-        background_tasks.add_task(fetch_google_all)
-        print(f"GOOGLE OAUTH: Added background sync task for {saved_count} accounts")
+        def post_login_sync():
+            fetch_google_all()
+            invalidate_insights_cache()
+
+        if submit_sync(post_login_sync):
+            print(f"GOOGLE OAUTH: Added background sync task for {saved_count} accounts")
+        else:
+            print("GOOGLE OAUTH: Sync already in progress, skipping post-login sync")
     else:
         print(f"GOOGLE OAUTH: FAILED to save any integrations for {user_email}")
 
     # Redirect back to the frontend
-    return RedirectResponse(url=f"{FRONTEND_URL}/integrations?success=true&platform=google")
+    return RedirectResponse(url=f"{CFG.frontend_url}/integrations?success=true&platform=google")
 
@@ -1,15 +1,26 @@
+import concurrent.futures
 import datetime
-import json
-import os
-from dotenv import load_dotenv
+import hashlib
+import threading
+from functools import lru_cache
+from itertools import groupby
+import grpc
 from google.ads.googleads.client import GoogleAdsClient
+from google.ads.googleads.errors import GoogleAdsException
+from google.api_core import exceptions as api_exceptions
+from google.api_core.retry import Retry
+from google.auth.transport.requests import Request as AuthRequest
+from google.oauth2.credentials import Credentials
 
+from utils.config import get_config
+from utils.log import get_logger
 from utils.security import decrypt_token
 
-# Load env
-ENV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), 'global.env')
-if os.path.exists(ENV_PATH):
-    load_dotenv(ENV_PATH, override=True)
+# Load env (once per process, shared with entry.py)
+CFG = get_config()
+
+# Per-account traces go through the queued logger; summaries stay on print
+logger = get_logger(__name__)
 
 # Google Ads API Version
 GOOGLE_ADS_VERSION = "v18"
@@ -20,49 +31,135 @@ from Database.database import DynamoDB
 metrics_db = DynamoDB(table_name="GoogleAdsInsights")
 integrations_db = DynamoDB(table_name="Integrations")
 
-DEVELOPER_TOKEN = os.getenv("GOOGLE_DEVELOPER_TOKEN", "")
-CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID", "")
-CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET", "")
-
-# Simple in-memory cache for discovery to prevent redundant calls in parallel threads
+# Simple in-memory cache for discovery to prevent redundant calls in parallel threads.
+# Seeded from the Integrations table (discovered_ids) so restarts skip discovery too.
 _discovery_cache = {}
+_discovery_lock = threading.Lock()
+
+# OAuth credentials per refresh token (keyed by its SHA-256, never the raw token).
+# google-auth keeps the access token and its expiry on the object, so every client
+# built from it reuses one access token until it expires instead of refreshing again.
+_credentials_cache = {}
+_credentials_lock = threading.Lock()
+
+def _token_key(refresh_token):
+    return hashlib.sha256(refresh_token.encode()).hexdigest()
+
+def get_credentials(refresh_token):
+    """
+    Returns shared OAuth credentials for a refresh token.
+    """
+    key = _token_key(refresh_token)
+    with _credentials_lock:
+        credentials = _credentials_cache.get(key)
+        if credentials is None:
+            credentials = Credentials(
+                token=None,
+                refresh_token=refresh_token,
+                client_id=CFG.google_client_id,
+                client_secret=CFG.google_client_secret,
+                token_uri="https://oauth2.googleapis.com/token",
+                scopes=["https://www.googleapis.com/auth/adwords"]
+            )
+            _credentials_cache[key] = credentials
+    _ensure_fresh(key, credentials)
+    return credentials
+
+# Refreshes currently running, per credentials key. The three range syncs build clients
+# for the same token at once, so without this each would POST to oauth2 on expiry.
+_refresh_inflight = {}
+_refresh_lock = threading.Lock()
+# Pooled transport for the token endpoint
+_AUTH_REQUEST = AuthRequest()
+
+def _ensure_fresh(key, credentials):
+    """
+    Refreshes the access token if it's missing or about to expire.
+    Concurrent callers for the same token wait on the one refresh already in flight.
+    """
+    if credentials.valid:
+        return
+    with _refresh_lock:
+        future = _refresh_inflight.get(key)
+        owner = future is None
+        if owner:
+            future = concurrent.futures.Future()
+            _refresh_inflight[key] = future
+    if not owner:
+        future.result()
+        return
+
+    try:
+        credentials.refresh(_AUTH_REQUEST)
+        future.set_result(None)
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _refresh_lock:
+            _refresh_inflight.pop(key, None)
+
+# Clients and their service stubs per (token key, login_customer_id). Each get_service
+# opens a new gRPC channel, so reusing stubs keeps one HTTP/2 connection per pair.
+_client_cache = {}
+_service_cache = {}
+_client_lock = threading.Lock()
 
 def get_google_client(refresh_token, login_customer_id=None):
     """
-    Creates a GoogleAdsClient from refresh token and env credentials.
+    Returns a shared GoogleAdsClient for a refresh token.
     If login_customer_id is provided, it's used for manager account access.
     """
-    credentials = {
-        "developer_token": DEVELOPER_TOKEN,
-        "client_id": CLIENT_ID,
-        "client_secret": CLIENT_SECRET,
-        "refresh_token": refresh_token,
-        "use_proto_plus": True
-    }
-    if login_customer_id:
-        credentials["login_customer_id"] = str(login_customer_id)
-    
-    return GoogleAdsClient.load_from_dict(credentials)
+    # Always go through get_credentials so an expired token is refreshed once, up front
+    credentials = get_credentials(refresh_token)
+    login_customer_id = str(login_customer_id) if login_customer_id else None
+    key = (_token_key(refresh_token), login_customer_id)
+    with _client_lock:
+        client = _client_cache.get(key)
+        if client is None:
+            client = GoogleAdsClient(
+                credentials=credentials,
+                developer_token=CFG.google_developer_token,
+                login_customer_id=login_customer_id,
+                use_proto_plus=True
+            )
+            _client_cache[key] = client
+    return client
+
+def get_google_service(refresh_token, name, login_customer_id=None):
+    """
+    Returns a shared service client (e.g. "GoogleAdsService") for the token/login pair.
+    """
+    client = get_google_client(refresh_token, login_customer_id)
+    key = (_token_key(refresh_token), str(login_customer_id) if login_customer_id else None, name)
+    with _client_lock:
+        service = _service_cache.get(key)
+        if service is None:
+            service = client.get_service(name)
+            _service_cache[key] = service
+    return service
 
 
 def discover_accounts(refresh_token, email=None):
     """
     Returns a list of accessible customer IDs for the given token using Google Ads Client.
     """
-    if email and email in _discovery_cache:
-        print(f"GOOGLE DISCOVERY: Using cached IDs for {email}")
-        return _discovery_cache[email]
+    if email:
+        with _discovery_lock:
+            cached = _discovery_cache.get(email)
+        if cached is not None:
+            logger.debug("GOOGLE DISCOVERY: Using cached IDs for %s", email)
+            return cached
 
     try:
-        client = get_google_client(refresh_token)
-        customer_service = client.get_service("CustomerService")
+        customer_service = get_google_service(refresh_token, "CustomerService")
         
-        print(f"GOOGLE DISCOVERY: Listing accessible customers using SDK...")
+        logger.info("GOOGLE DISCOVERY: Listing accessible customers using SDK...")
         accessible_customers = customer_service.list_accessible_customers()
         resource_names = accessible_customers.resource_names
         customer_ids = [rn.split("/")[-1] for rn in resource_names]
         
-        print(f"GOOGLE DISCOVERY: Found {len(customer_ids)} base accounts: {customer_ids}")
+        logger.info("GOOGLE DISCOVERY: Found %d base accounts: %s", len(customer_ids), customer_ids)
         
         # Now, for each base account, check if it's a manager and find its sub-accounts
         all_discovered_ids = set(customer_ids)
@@ -72,10 +169,11 @@ def discover_accounts(refresh_token, email=None):
         
         result = list(all_discovered_ids)
         if email:
-            _discovery_cache[email] = result
+            with _discovery_lock:
+                _discovery_cache[email] = result
         return result
     except Exception as e:
-        print(f"GOOGLE DISCOVERY SDK ERROR: {e}")
+        logger.error("GOOGLE DISCOVERY SDK ERROR: %s", e)
         return []
 
 def find_sub_accounts_sdk(manager_id, refresh_token):
@@ -83,107 +181,170 @@ def find_sub_accounts_sdk(manager_id, refresh_token):
     Given a manager ID, finds all sub-accounts (clients) under it using SDK.
     """
     try:
-        print(f"GOOGLE DISCOVERY: Checking if {manager_id} has sub-accounts via SDK...")
+        logger.debug("GOOGLE DISCOVERY: Checking if %s has sub-accounts via SDK...", manager_id)
         # For manager queries, we must set "login-customer-id"
         client = get_google_client(refresh_token, login_customer_id=manager_id)
-        ga_service = client.get_service("GoogleAdsService")
+        ga_service = get_google_service(refresh_token, "GoogleAdsService", login_customer_id=manager_id)
         
         # Query for all client accounts under this manager
         query = "SELECT customer_client.client_customer, customer_client.descriptive_name, customer_client.manager FROM customer_client WHERE customer_client.level <= 1"
         
-        search_request = client.get_type("SearchGoogleAdsRequest")
+        search_request = client.get_type("SearchGoogleAdsStreamRequest")
         search_request.customer_id = str(manager_id)
         search_request.query = query
         
-        response = ga_service.search(request=search_request)
+        stream = ga_service.search_stream(request=search_request)
         
         client_ids = []
-        for row in response:
+        for row in (row for batch in stream for row in batch.results):
             client_client = row.customer_client
             # Only get actual client accounts, not sub-managers
             if not client_client.manager:
                 cid = client_client.client_customer.split("/")[-1]
                 client_ids.append(cid)
                 
-        print(f"GOOGLE DISCOVERY: Found {len(client_ids)} clients under manager {manager_id}")
+        logger.info("GOOGLE DISCOVERY: Found %d clients under manager %s", len(client_ids), manager_id)
         return client_ids
     except Exception as e:
         # Some accounts might not be managers, ignore errors
-        print(f"GOOGLE SUB-ACCOUNT DISCOVERY: {manager_id} skip or error: {e}")
+        logger.debug("GOOGLE SUB-ACCOUNT DISCOVERY: %s skip or error: %s", manager_id, e)
         return []
 
-def fetch_for_customer(customer_id, refresh_token, days, login_customer_id=None):
+@lru_cache(maxsize=32)
+def _window(days, today):
+    start_date = (today - datetime.timedelta(days=days)).isoformat()
+    end_date = (today - datetime.timedelta(days=1)).isoformat()
+    return start_date, end_date
+
+def _date_range(days, today=None):
+    """Returns (start, end) as YYYY-MM-DD for the last `days` days, ending yesterday."""
+    return _window(days, today or datetime.date.today())
+
+# Campaign metrics GAQL, one row per campaign per day; only the date window changes between calls
+_GAQL_TEMPLATE = (
+    "SELECT campaign.id, campaign.name, segments.date, metrics.cost_micros, metrics.conversions_value, "
+    "metrics.conversions, customer.descriptive_name "
+    "FROM campaign WHERE segments.date BETWEEN '{start}' AND '{end}'"
+)
+
+# gRPC statuses worth retrying in-process instead of dropping a customer's whole range
+_TRANSIENT_CODES = (
+    grpc.StatusCode.UNAVAILABLE,
+    grpc.StatusCode.RESOURCE_EXHAUSTED,
+    grpc.StatusCode.INTERNAL,
+    grpc.StatusCode.DEADLINE_EXCEEDED,
+)
+
+def _is_transient(exc):
+    # Google Ads failures arrive wrapped in GoogleAdsException, plain transport errors don't
+    if isinstance(exc, GoogleAdsException):
+        return exc.error.code() in _TRANSIENT_CODES
+    return isinstance(exc, (
+        api_exceptions.ServiceUnavailable,
+        api_exceptions.ResourceExhausted,
+        api_exceptions.InternalServerError,
+        api_exceptions.DeadlineExceeded,
+    ))
+
+# Exponential backoff 0.5s -> 10s, giving up after 60s overall.
+# Applies to opening the stream; a stream that breaks midway fails that customer.
+_SEARCH_RETRY = Retry(predicate=_is_transient, initial=0.5, maximum=10.0, multiplier=2.0, timeout=60.0)
+
+# Google cost is in micros (1/1,000,000)
+_MICROS = 1_000_000
+
+def _build_row(campaign_id, campaign_name, account_name, cost_micros, conv_value, conversions):
     """
-    Fetches campaign-level insights for a single Google Ads Account using official SDK.
+    Renders one campaign's totals into the Meta-shaped dict the dashboard expects.
+    Cost stays in integer micros until it's rendered, so spend is exact.
     """
-    if not DEVELOPER_TOKEN:
-        print(f"[{customer_id}] Error: GOOGLE_DEVELOPER_TOKEN not set in global.env")
-        return []
+    # Paused campaigns have no spend, skip the division entirely
+    roas = conv_value * _MICROS / cost_micros if cost_micros else 0
+    return {
+        "campaign_id": campaign_id,
+        "campaign_name": campaign_name,
+        "spend": f"{cost_micros // _MICROS}.{cost_micros % _MICROS:06d}",
+        "account_name": account_name,
+        "platform": "google",
+        # Mimic Meta structure for frontend compatibility
+        "website_purchase_roas": [{"value": format(roas, '.6g')}],
+        # Summing daily doubles picks up float noise, so round to the precision the API reports
+        "action_values": [{"action_type": "offsite_conversion.fb_pixel_purchase", "value": str(round(conv_value, 6))}],
+        "actions": [{"action_type": "offsite_conversion.fb_pixel_purchase", "value": str(round(conversions, 6))}]
+    }
+
+def _aggregate_ranges(rows, customer_id, windows):
+    """
+    Sums daily GoogleAdsService rows into one dashboard row per campaign per range.
+    `windows` maps days -> first date of that range; ISO dates compare correctly as strings.
+    Returns {days: [row, ...]}.
+    """
+    totals = {days: {} for days in windows}  # days -> campaign_id -> [name, account, cost, value, conversions]
+    for row in rows:
+        date = row.segments.date
+        metrics = row.metrics
+        campaign_id = str(row.campaign.id)
+        cost_micros = int(metrics.cost_micros)
+        conv_value = metrics.conversions_value
+        conversions = metrics.conversions
+        for days, start_date in windows.items():
+            if date < start_date:
+                continue
+            acc = totals[days].get(campaign_id)
+            if acc is None:
+                account_name = row.customer.descriptive_name or f"Account {customer_id}"
+                acc = totals[days][campaign_id] = [row.campaign.name, account_name, 0, 0.0, 0.0]
+            acc[2] += cost_micros
+            acc[3] += conv_value
+            acc[4] += conversions
+    return {
+        days: [_build_row(campaign_id, *acc) for campaign_id, acc in campaigns.items()]
+        for days, campaigns in totals.items()
+    }
+
+def fetch_ranges_for_customer(customer_id, refresh_token, windows, end_date, login_customer_id=None):
+    """
+    Fetches daily campaign rows for a single Google Ads Account once, over the widest window,
+    and aggregates them into every range in `windows` (days -> start date).
+    Returns {days: rows}.
+    """
+    empty = {days: [] for days in windows}
+    if not CFG.google_developer_token:
+        logger.error("[%s] Error: GOOGLE_DEVELOPER_TOKEN not set in global.env", customer_id)
+        return empty
 
     try:
         # 1. Time Range Calculation
-        start_date = (datetime.date.today() - datetime.timedelta(days=days)).strftime('%Y-%m-%d')
-        end_date = (datetime.date.today() - datetime.timedelta(days=1)).strftime('%Y-%m-%d')
+        start_date = min(windows.values())
         
-        print(f"[{customer_id}] Fetching Google insights (SDK) for last {days} days ({start_date} to {end_date})...")
+        logger.debug("[%s] Fetching Google insights (SDK) for %s to %s...", customer_id, start_date, end_date)
 
         # 2. Initialize Client
         # If we have a login_customer_id (manager ID), use it; otherwise fallback to customer_id itself
-        client = get_google_client(refresh_token, login_customer_id=login_customer_id or customer_id)
-        ga_service = client.get_service("GoogleAdsService")
+        login_id = login_customer_id or customer_id
+        client = get_google_client(refresh_token, login_customer_id=login_id)
+        ga_service = get_google_service(refresh_token, "GoogleAdsService", login_customer_id=login_id)
 
         # 3. GAQL Query
-        query = f"""
-            SELECT
-                campaign.id,
-                campaign.name,
-                metrics.cost_micros,
-                metrics.conversions_value,
-                metrics.conversions,
-                customer.descriptive_name
-            FROM campaign
-            WHERE segments.date BETWEEN '{start_date}' AND '{end_date}'
-        """
+        query = _GAQL_TEMPLATE.format(start=start_date, end=end_date)
 
         # 4. Request
-        search_request = client.get_type("SearchGoogleAdsRequest")
+        # search_stream returns every row over one streaming call instead of paging
+        search_request = client.get_type("SearchGoogleAdsStreamRequest")
         search_request.customer_id = str(customer_id)
         search_request.query = query
 
-        response = ga_service.search(request=search_request)
+        stream = ga_service.search_stream(request=search_request, retry=_SEARCH_RETRY)
         
         # 5. Transform
-        formatted_data = []
-        for row in response:
-            campaign = row.campaign
-            metrics = row.metrics
-            customer = row.customer
-            
-            # Google cost is in micros (1/1,000,000)
-            spend = float(metrics.cost_micros) / 1_000_000
-            conv_value = float(metrics.conversions_value)
-            conversions = float(metrics.conversions)
-            
-            roas = conv_value / spend if spend > 0 else 0
-            
-            formatted_data.append({
-                "campaign_id": str(campaign.id),
-                "campaign_name": campaign.name,
-                "spend": str(spend),
-                "account_name": customer.descriptive_name or f"Account {customer_id}",
-                "platform": "google",
-                # Mimic Meta structure for frontend compatibility
-                "website_purchase_roas": [{"value": str(roas)}],
-                "action_values": [{"action_type": "offsite_conversion.fb_pixel_purchase", "value": str(conv_value)}],
-                "actions": [{"action_type": "offsite_conversion.fb_pixel_purchase", "value": str(conversions)}]
-            })
+        formatted_data = _aggregate_ranges((row for batch in stream for row in batch.results), customer_id, windows)
             
-        print(f"[{customer_id}] Successfully fetched {len(formatted_data)} campaign rows via SDK.")
+        logger.debug("[%s] Successfully fetched %d campaigns via SDK.", customer_id, len(formatted_data[max(windows)]))
         return formatted_data
 
     except Exception as e:
-        print(f"[{customer_id}] SDK Error fetching Google insights: {e}")
-        return []
+        logger.error("[%s] SDK Error fetching Google insights: %s", customer_id, e)
+        return empty
 
 def write_to_dynamodb(data, days):
     """
@@ -191,111 +352,154 @@ def write_to_dynamodb(data, days):
     """
     if not data:
         return
-    metrics_db.create_table(pk='campaign_id', sk='range_days', sk_type='N')
+    # Store platform with the row so reads don't have to patch it in
+    for row in data:
+        row.setdefault('platform', 'google')
+    # Table is created by init_db_logic at startup
     metrics_db.batch_write_campaign_metrics(data, days)
 
-def fetch_and_store(days: int = 7):
+# Concurrent customer fetches; one pass covers every range
+CUSTOMER_WORKERS = 16
+
+def fetch_and_store_ranges(days_list, today: datetime.date = None):
     """
-    Fetches data for all connected Google accounts and stores in DynamoDB.
+    Fetches data for all connected Google accounts and stores in DynamoDB for every range.
+    Each customer is queried once over the widest window and the shorter ranges are summed
+    from the same daily rows. `today` anchors the date windows.
+    Returns {days: rows}.
     """
-    integrations = integrations_db.list_integrations(platform="google")
+    results = {days: [] for days in days_list}
+    integrations = integrations_db.list_integrations(platform="google", include_tokens=True)
     
     if not integrations:
         print("No Google integrations found.")
-        return []
+        return results
 
-    print(f"GOOGLE SYNC: Starting fetch for {len(integrations)} integrations (Range: {days} days)")
+    print(f"GOOGLE SYNC: Starting fetch for {len(integrations)} integrations (Ranges: {list(days_list)} days)")
     
-    all_results = []
+    # customer_id -> refresh_token per numeric CID. A CID discovered under an email login can
+    # also have its own row; it must be fetched (and written) only once.
+    tasks = {}
+    # Same windows for every customer; every range ends yesterday, so they differ only in start
+    today = today or datetime.date.today()
+    windows = {days: _date_range(days, today)[0] for days in days_list}
+    _, end_date = _date_range(max(days_list), today)
     
+    valid_accounts = []
     for account in integrations:
         email = account.get('email')
         token = account.get('access_token')
         cid = account.get('account_id')
         
         if not email or not token or not cid:
-            print(f"GOOGLE SYNC: Skipping account due to missing data: {email} (CID: {cid})")
+            logger.warning("GOOGLE SYNC: Skipping account due to missing data: %s (CID: %s)", email, cid)
             continue
-            
+        valid_accounts.append(account)
+    
+    # Accounts from one OAuth login share a token: decrypt it once per group, not per account
+    valid_accounts.sort(key=lambda a: a['access_token'])
+    for token, group in groupby(valid_accounts, key=lambda a: a['access_token']):
         # The SDK handles its own token refresh if we give it the refresh token.
         # decrypt_token(token) should be the refresh token (starts with 1//).
         raw_token = decrypt_token(token)
         
-        # 2. Handle Case where CID is an email (needs discovery)
-        customer_ids = []
-        if "@" in str(cid):
-            print(f"GOOGLE SYNC: CID is an email ({cid}), attempting discovery via SDK...")
-            customer_ids = discover_accounts(raw_token, email=email)
+        for account in group:
+            email = account.get('email')
+            cid = account.get('account_id')
             
-            if customer_ids:
-                print(f"GOOGLE SYNC: Found {len(customer_ids)} IDs for {cid}. Updating integration records...")
-                for real_cid in customer_ids:
-                    integrations_db.save_integration(
-                        platform="google",
-                        account_id=real_cid,
-                        account_name=f"Google Account ({real_cid})",
-                        email=email,
-                        access_token=token
-                    )
+            # 2. Handle Case where CID is an email (needs discovery)
+            customer_ids = []
+            if "@" in str(cid):
+                stored_ids = account.get('discovered_ids')
+                if stored_ids:
+                    with _discovery_lock:
+                        _discovery_cache.setdefault(email, list(stored_ids))
+                logger.debug("GOOGLE SYNC: CID is an email (%s), attempting discovery via SDK...", cid)
+                customer_ids = discover_accounts(raw_token, email=email)
+                
+                if customer_ids and sorted(customer_ids) != sorted(stored_ids or []):
+                    # Only written when discovery turned up something new, not on every sync
+                    logger.info("GOOGLE SYNC: Found %d IDs for %s. Updating integration records...", len(customer_ids), cid)
+                    integrations_db.batch_save_integrations([
+                        {
+                            "platform": "google",
+                            "account_id": real_cid,
+                            "account_name": f"Google Account ({real_cid})",
+                            "email": email,
+                            "access_token": token
+                        }
+                        for real_cid in customer_ids
+                    ] + [{
+                        "platform": "google",
+                        "account_id": cid,
+                        "account_name": account.get('account_name'),
+                        "email": email,
+                        "access_token": token,
+                        "status": account.get('status', "Active"),
+                        "discovered_ids": customer_ids
+                    }])
+                elif not customer_ids:
+                    logger.warning("GOOGLE SYNC: No Google Ads accounts found associated with email %s. Stopping sync for this account.", cid)
+                    customer_ids = []
             else:
-                print(f"GOOGLE SYNC: No Google Ads accounts found associated with email {cid}. Stopping sync for this account.")
-                customer_ids = []
-        else:
-            customer_ids = [cid]
-
-        for target_cid in customer_ids:
-            if "@" in str(target_cid):
-                print(f"GOOGLE SYNC: Skipping API call for non-numeric CID: {target_cid}")
-                continue
+                customer_ids = [cid]
 
-            print(f"GOOGLE SYNC: Fetching metrics for numeric CID {target_cid} ({email})...")
-            # For target_cid, we pass target_cid as login_customer_id if it's a direct account.
-            # If it's a sub-account of a manager, the SDK might need the manager CID, 
-            # but usually the account CID itself works if we have permissions.
-            account_data = fetch_for_customer(target_cid, raw_token, days)
-            
-            if account_data:
-                print(f"GOOGLE SYNC: Found {len(account_data)} campaigns for CID {target_cid}. Writing to DB...")
-                write_to_dynamodb(account_data, days)
-                all_results.extend(account_data)
-            else:
-                print(f"GOOGLE SYNC: No performance data found for CID {target_cid} in the last {days} days.")
-            
-    print(f"✅ GOOGLE SYNC COMPLETE: Total {len(all_results)} campaigns synced for {days} days.")
-    return all_results
+            for target_cid in customer_ids:
+                if "@" in str(target_cid):
+                    logger.debug("GOOGLE SYNC: Skipping API call for non-numeric CID: %s", target_cid)
+                    continue
 
-import concurrent.futures
+                logger.debug("GOOGLE SYNC: Queued metrics fetch for numeric CID %s (%s)...", target_cid, email)
+                tasks.setdefault(str(target_cid), raw_token)
+    
+    # Each customer is an independent blocking API call; rate limits are per customer,
+    # so run them side by side instead of summing their latencies.
+    # For target_cid, we pass target_cid as login_customer_id if it's a direct account.
+    # If it's a sub-account of a manager, the SDK might need the manager CID, 
+    # but usually the account CID itself works if we have permissions.
+    if tasks:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(CUSTOMER_WORKERS, len(tasks))) as executor:
+            fetch = lambda t: fetch_ranges_for_customer(t[0], t[1], windows, end_date)
+            for target_cid, by_range in zip(tasks, executor.map(fetch, tasks.items())):
+                if any(by_range.values()):
+                    logger.debug("GOOGLE SYNC: Found %d campaigns for CID %s.", len(by_range[max(days_list)]), target_cid)
+                    for days, rows in by_range.items():
+                        results[days].extend(rows)
+                else:
+                    logger.debug("GOOGLE SYNC: No performance data found for CID %s in the last %d days.", target_cid, max(days_list))
+    
+    # One write per range so every BatchWriteItem carries a full 25 items
+    for days in days_list:
+        write_to_dynamodb(results[days], days)
+        print(f"✅ GOOGLE SYNC COMPLETE: Total {len(results[days])} campaigns synced for {days} days.")
+    return results
 
 def fetch_and_store_all():
     """
     Syncs data for all 3 dashboard time ranges: 7, 30, and 180 days.
+    One 180-day pull per customer feeds all three.
     """
     print("🚀 Starting Google multi-range sync...")
-    
-    with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-        days_list = [7, 30, 180]
-        future_to_days = {executor.submit(fetch_and_store, days): days for days in days_list}
-        
-        for future in concurrent.futures.as_completed(future_to_days):
-            days = future_to_days[future]
-            try:
-                future.result()
-                print(f"✅ Google Sync for {days} days completed.")
-            except Exception as e:
-                print(f"❌ Error fetching Google for range {days}: {e}")
-                
+    try:
+        fetch_and_store_ranges([7, 30, 180])
+    except Exception as e:
+        print(f"❌ Error in Google multi-range sync: {e}")
+        return
     print("✅ Full Google multi-range sync completed.")
 
 def get_cached_insights(days: int = 7):
     """
     Returns data from DynamoDB.
-    Ensures 'platform' field is present for frontend filtering.
+    'platform' is stored at write time (see write_to_dynamodb / backfill_platform.py).
     """
-    data = metrics_db.read_campaign_metrics(days)
-    for row in data:
-        if 'platform' not in row:
-            row['platform'] = 'google'
-    return data
+    return metrics_db.read_campaign_metrics(days)
+
+def get_cached_insights_multi(days_list):
+    """
+    Same as get_cached_insights for several ranges, read in one parallel batch.
+    Returns {days: rows}, with None for a range whose read failed.
+    """
+    return metrics_db.read_campaign_metrics_multi(days_list)
 
 if __name__ == "__main__":
     fetch_and_store_all()
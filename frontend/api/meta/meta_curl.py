@@ -1,67 +1,162 @@
+import asyncio
 import requests
 import datetime
 import json
-import os
-from dotenv import load_dotenv
-from utils.security import decrypt_token
+import orjson
+import urllib.parse
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from utils.config import get_config
+from utils.security import decrypt_tokens
+from utils.log import get_logger
 
 
-# Load env immediately to ensure DB has credentials
-ENV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), 'global.env')
-if os.path.exists(ENV_PATH):
-    load_dotenv(ENV_PATH, override=True)
+# Load env immediately to ensure DB has credentials (once per process)
+get_config()
 
 # Meta API Version
 FB_VERSION = "v24.0"
 
+# Per-account traces go through the queued logger; summaries stay on print
+logger = get_logger(__name__)
+
+# Keep-alive pool for graph.facebook.com, sized for the per-account fan-out across ranges.
+# Insights go out as batch POSTs that only wrap GETs, so POST is safe to retry too
+# (urllib3 skips it by default).
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=64,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=(429, 502, 503, 504), allowed_methods=None)
+))
+
 from Database.database import DynamoDB
 
 # Initialize Database connections
 metrics_db = DynamoDB(table_name="MetaAdsInsights")
 integrations_db = DynamoDB(table_name="Integrations")
 
-def fetch_for_account(account_id, token, days):
+# Graph rejects batch requests with more than 50 sub-requests
+GRAPH_BATCH_LIMIT = 50
+# Sub-request outcomes worth one more try: throttling and server errors (timeouts come back null)
+SUBREQUEST_RETRY_CODES = frozenset((429, 500, 502, 503, 504))
+
+def _clean_id(account_id):
+    """Ensures the account id has the 'act_' prefix Graph expects."""
+    clean_id = account_id.strip()
+    if not clean_id.startswith('act_'):
+        clean_id = f"act_{clean_id}"
+    return clean_id
+
+# Account names rarely change; remember them per process so syncs skip the lookup
+_acct_name_cache = {}  # clean act_ id -> name
+
+def get_account_name(account_id, token, stored_name=None):
     """
-    Fetches campaign-level insights for a single Meta Ad Account.
+    Returns the Meta account name, preferring the Integrations record, then the cache.
+    Only hits Graph on a miss.
     """
+    clean_id = _clean_id(account_id)
+
+    if stored_name:
+        _acct_name_cache[clean_id] = stored_name
+        return stored_name
+    if clean_id in _acct_name_cache:
+        return _acct_name_cache[clean_id]
+
     try:
-        # 1. Clean up account_id to ensure it has 'act_' prefix
-        clean_id = account_id.strip()
-        if not clean_id.startswith('act_'):
-            clean_id = f"act_{clean_id}"
-
-        # 2. Time Range Calculation
-        # Meta expects JSON object { 'since': 'YYYY-MM-DD', 'until': 'YYYY-MM-DD' }
-        start_date = (datetime.date.today() - datetime.timedelta(days=days)).isoformat()
-        end_date = datetime.date.today().isoformat()
-        time_range = {"since": start_date, "until": end_date}
-
-        print(f"[{account_id}] Fetching Meta insights for last {days} days (from {start_date})...")
-
-        # 3. Make the API request
-        url = f"https://graph.facebook.com/{FB_VERSION}/{clean_id}/insights"
-        params = {
-            "level": "campaign",
-            "fields": "campaign_id,campaign_name,spend,website_purchase_roas,action_values,actions",
-            "time_range": json.dumps(time_range),
-            "access_token": token,
-            "limit": 500  # Fetch more rows per page
-        }
+        name_r = _session.get(f"https://graph.facebook.com/{FB_VERSION}/{clean_id}",
+                              params={"access_token": token, "fields": "name"})
+        acc_name = orjson.loads(name_r.content).get("name")
+    except Exception:
+        acc_name = None
+    if not acc_name:
+        # Don't cache the fallback, the next sync should retry the lookup
+        return f"Account {account_id}"
+    _acct_name_cache[clean_id] = acc_name
+    return acc_name
 
-        r = requests.get(url, params=params)
-        r.raise_for_status()
-        
-        data = r.json().get("data", [])
-        print(f"[{account_id}] Successfully fetched {len(data)} campaign rows.")
-        return data
+@lru_cache(maxsize=32)
+def _insights_query(days, today):
+    """
+    Returns (start_date, query string) for an insights range ending `today`.
+    Every batch in a sync shares the same few (days, today) pairs, so this is built once each.
+    """
+    # Meta expects JSON object { 'since': 'YYYY-MM-DD', 'until': 'YYYY-MM-DD' }
+    start_date = (today - datetime.timedelta(days=days)).isoformat()
+    time_range = {"since": start_date, "until": today.isoformat()}
+    query = urllib.parse.urlencode({
+        "level": "campaign",
+        "fields": "campaign_id,campaign_name,spend,website_purchase_roas,action_values,actions",
+        "time_range": json.dumps(time_range),
+        "limit": 500  # Fetch more rows per page
+    })
+    return start_date, query
 
+def _post_batch(batch, token):
+    """
+    Sends one Graph batch request; the token travels in the POST body, not the URL.
+    Returns the list of sub-responses, or None if the request itself failed.
+    """
+    try:
+        r = _session.post("https://graph.facebook.com/", data={
+            "access_token": token,
+            "batch": orjson.dumps(batch),
+            "include_headers": "false"
+        })
+        r.raise_for_status()
+        # orjson parses the (large) batch envelope and each sub-body several times faster than stdlib json
+        return orjson.loads(r.content)
     except Exception as e:
         # Print detailed error if it's a request error
         if isinstance(e, requests.exceptions.HTTPError):
-            print(f"[{account_id}] Meta API Error: {e.response.text}")
+            logger.error("Meta API Error: %s", e.response.text)
         else:
-            print(f"[{account_id}] Error fetching Meta insights: {e}")
-        return []
+            logger.error("Error fetching Meta insights: %s", e)
+        return None
+
+def fetch_for_accounts(account_ids, token, days, today: datetime.date = None):
+    """
+    Fetches campaign-level insights for up to 50 Meta Ad Accounts sharing one token
+    with a single Graph batch request. Returns one row list per account, in order.
+    """
+    # 1. Time Range Calculation
+    start_date, query = _insights_query(days, today or datetime.date.today())
+
+    logger.debug("Fetching Meta insights for %d accounts, last %d days (from %s)...", len(account_ids), days, start_date)
+
+    # 2. One sub-request per account, all sharing the same query string
+    batch = [
+        {"method": "GET", "relative_url": f"{FB_VERSION}/{_clean_id(account_id)}/insights?{query}"}
+        for account_id in account_ids
+    ]
+
+    # 3. Make the API request
+    responses = _post_batch(batch, token)
+    if responses is None:
+        return [[] for _ in account_ids]
+
+    # Re-issue the sub-requests that timed out or hit a transient error, once
+    retry = [i for i, response in enumerate(responses) if not response or response.get("code") in SUBREQUEST_RETRY_CODES]
+    if retry:
+        logger.debug("Retrying %d of %d Meta batch sub-requests...", len(retry), len(batch))
+        retried = _post_batch([batch[i] for i in retry], token)
+        if retried is not None:
+            for i, response in zip(retry, retried):
+                responses[i] = response
+
+    results = []
+    for account_id, response in zip(account_ids, responses):
+        # Graph returns null for sub-requests that didn't finish in time
+        if not response or response.get("code") != 200:
+            logger.error("[%s] Meta API Error: %s", account_id, response.get('body') if response else 'batch sub-request timed out')
+            results.append([])
+            continue
+        data = orjson.loads(response["body"]).get("data", [])
+        logger.debug("[%s] Successfully fetched %d campaign rows.", account_id, len(data))
+        results.append(data)
+    return results
 
 def write_to_dynamodb(data, days):
     """
@@ -69,56 +164,102 @@ def write_to_dynamodb(data, days):
     """
     if not data:
         return
-    # Ensure the metrics table exists before writing
-    metrics_db.create_table(pk='campaign_id', sk='range_days', sk_type='N')
+    # Store platform with the row so reads don't have to patch it in
+    for row in data:
+        row.setdefault('platform', 'meta')
+    # Table is created by init_db_logic at startup
     # Use batch write for efficiency
     metrics_db.batch_write_campaign_metrics(data, days)
 
-def fetch_and_store(days: int = 7):
+# Concurrent batch calls per range; with three ranges in flight that's ~48 calls at most
+ACCOUNT_WORKERS = 16
+
+async def _fetch_accounts(accounts, days, today):
     """
-    Fetches data for all connected Meta accounts and stores in DynamoDB.
+    Fetches insights for every (account_id, raw_token) pair, returning rows in the same order.
+    Accounts sharing a token go out together as Graph batches of up to 50.
+    requests is blocking, so each batch runs in a worker thread.
     """
-    integrations = integrations_db.list_integrations(platform="meta")
-    
-    if not integrations:
+    by_token = {}
+    for i, (_, raw_token) in enumerate(accounts):
+        by_token.setdefault(raw_token, []).append(i)
+    batches = [
+        (raw_token, indexes[j:j + GRAPH_BATCH_LIMIT])
+        for raw_token, indexes in by_token.items()
+        for j in range(0, len(indexes), GRAPH_BATCH_LIMIT)
+    ]
+    limit = asyncio.Semaphore(ACCOUNT_WORKERS)
+
+    async def fetch(raw_token, indexes):
+        async with limit:
+            return await asyncio.to_thread(fetch_for_accounts, [accounts[i][0] for i in indexes], raw_token, days, today)
+
+    fetched = await asyncio.gather(*(fetch(raw_token, indexes) for raw_token, indexes in batches))
+    results = [[] for _ in accounts]
+    for (_, indexes), rows_per_account in zip(batches, fetched):
+        for i, rows in zip(indexes, rows_per_account):
+            results[i] = rows
+    return results
+
+def _load_accounts():
+    """
+    Returns [(integration, raw_token)] for every syncable Meta integration.
+    Accounts from one login share a token, so each distinct ciphertext is decrypted once.
+    """
+    integrations = integrations_db.list_integrations(platform="meta", include_tokens=True)
+    integrations = [a for a in integrations if a.get('account_id') and a.get('access_token')]
+    ciphertexts = list({a['access_token'] for a in integrations})
+    raw_tokens = dict(zip(ciphertexts, decrypt_tokens(ciphertexts)))
+    return [(a, raw_tokens[a['access_token']]) for a in integrations]
+
+async def _fetch_and_store(days, today, accounts):
+    """
+    Syncs one range on the running event loop.
+    Blocking DynamoDB and Graph calls are pushed to worker threads.
+    `accounts` comes from _load_accounts, loaded once and shared by every range.
+    """
+    if not accounts:
         print("No Meta integrations found.")
         return []
 
-    print(f"Syncing {len(integrations)} Meta accounts for {days} days...")
+    print(f"Syncing {len(accounts)} Meta accounts for {days} days...")
     
     all_results = []
+    # The raw token feeds both the insights and name calls
+    # Fetch from Meta API: accounts are independent, so wait for the slowest instead of the sum
+    fetched = await _fetch_accounts(
+        [(a['account_id'], raw_token) for a, raw_token in accounts], days, today
+    )
     
-    for account in integrations:
-        account_id = account.get('account_id')
-        token = account.get('access_token')
-        
-        if not account_id or not token:
-            continue
-            
-        # Fetch from Meta API
-        account_data = fetch_for_account(account_id, decrypt_token(token), days)
+    # Account names: the Integrations record or the process cache answers almost every
+    # account inline; only the misses go to Graph, all at once
+    names = [
+        account.get('account_name') or _acct_name_cache.get(_clean_id(account['account_id']))
+        for account, _ in accounts
+    ]
+    misses = [i for i, name in enumerate(names) if not name]
+    if misses:
+        looked_up = await asyncio.gather(*(
+            asyncio.to_thread(get_account_name, accounts[i][0]['account_id'], accounts[i][1])
+            for i in misses
+        ))
+        for i, name in zip(misses, looked_up):
+            names[i] = name
 
-        
-        # Get account name
-        try:
-            clean_id = account_id.strip()
-            if not clean_id.startswith('act_'):
-                clean_id = f"act_{clean_id}"
-            name_r = requests.get(f"https://graph.facebook.com/{FB_VERSION}/{clean_id}", 
-                                  params={"access_token": decrypt_token(token), "fields": "name"})
-
-            acc_name = name_r.json().get("name", f"Account {account_id}")
-        except:
-            acc_name = f"Account {account_id}"
-
-        # Add account name and platform to each row
+    for (account, _), account_data, acc_name in zip(accounts, fetched, names):
+        account_id = account['account_id']
+        token = account['access_token']
+
+        # Add account name to each row (platform is stamped by write_to_dynamodb)
         for row in account_data:
             row['account_name'] = acc_name
-            row['platform'] = 'meta'
         
         # Patch the integration record if account_name is missing
         if not account.get('account_name'):
-            integrations_db.save_integration(
+            # Set first so the other ranges sharing this record don't patch it again
+            account['account_name'] = acc_name
+            await asyncio.to_thread(
+                integrations_db.save_integration,
                 platform='meta',
                 account_id=account_id,
                 email=account.get('email'),
@@ -126,48 +267,55 @@ def fetch_and_store(days: int = 7):
                 account_name=acc_name
             )
 
-        # Batch write to DynamoDB
-        if account_data:
-            write_to_dynamodb(account_data, days)
-            all_results.extend(account_data)
-            
+        all_results.extend(account_data)
+    
+    # One write per range so every BatchWriteItem carries a full 25 items,
+    # instead of a partial batch per account
+    await asyncio.to_thread(write_to_dynamodb, all_results, days)
     print(f"✅ Synced {len(all_results)} campaigns for {days} days")
     return all_results
 
-import concurrent.futures
+async def _fetch_and_store_ranges(days_list):
+    """
+    Runs the per-range syncs concurrently as coroutines on one event loop.
+    """
+    # One "today" for every range, so all windows end on the same day even across midnight
+    today = datetime.date.today()
+    # One Integrations read and one decrypt per token for the whole sync, not per range
+    accounts = await asyncio.to_thread(_load_accounts)
+    results = await asyncio.gather(
+        *(_fetch_and_store(days, today, accounts) for days in days_list),
+        return_exceptions=True
+    )
+    for days, result in zip(days_list, results):
+        if isinstance(result, Exception):
+            print(f"❌ Error fetching for range {days}: {result}")
+        else:
+            print(f"✅ Sync for {days} days completed.")
 
 def fetch_and_store_all():
     """
     Syncs data for all 3 dashboard time ranges: 7, 30, and 180 days.
-    Uses threaded workers to fetch ranges concurrently.
     """
     print("🚀 Starting full multi-range sync...")
-    
-    # Run fetches for 7, 30, and 180 days in parallel
-    with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-        days_list = [7, 30, 180]
-        future_to_days = {executor.submit(fetch_and_store, days): days for days in days_list}
-        
-        for future in concurrent.futures.as_completed(future_to_days):
-            days = future_to_days[future]
-            try:
-                future.result()
-                print(f"✅ Sync for {days} days completed.")
-            except Exception as e:
-                print(f"❌ Error fetching for range {days}: {e}")
-                
+    asyncio.run(_fetch_and_store_ranges([7, 30, 180]))
     print("✅ Full multi-range sync completed.")
 
 def get_cached_insights(days: int = 7):
     """
     Returns data from DynamoDB without hitting Meta API.
-    Ensures 'platform' field is present for frontend filtering.
+    'platform' is stored at write time (see write_to_dynamodb / backfill_platform.py).
     """
-    data = metrics_db.read_campaign_metrics(days)
-    for row in data:
-        if 'platform' not in row:
-            row['platform'] = 'meta'
-    return data
+    return metrics_db.read_campaign_metrics(days)
+
+def get_cached_insights_multi(days_list):
+    """
+    Same as get_cached_insights for several ranges, read in one parallel batch.
+    Returns {days: rows}, with None for a range whose read failed.
+    """
+    return metrics_db.read_campaign_metrics_multi(days_list)
 
 if __name__ == "__main__":
+    # Run standalone there's no app startup to create the table
+    metrics_db.create_table(pk='campaign_id', sk='range_days', sk_type='N')
     fetch_and_store_all()
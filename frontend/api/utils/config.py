@@ -0,0 +1,53 @@
+"""
+App configuration read from the environment.
+global.env is parsed once and the cleaned values are frozen into a Config,
+so modules share one instance instead of re-reading env vars on import.
+Modules that only need the env loaded (AWS credentials, ENCRYPTION_KEY) call get_config() too.
+"""
+
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from functools import lru_cache
+from dotenv import load_dotenv
+
+ENV_PATH = Path(__file__).resolve().parents[3] / 'global.env'
+
+
+@dataclass(frozen=True, slots=True)
+class Config:
+    meta_client_id: str
+    meta_client_secret: str
+    meta_redirect_uri: str
+    google_client_id: str
+    google_client_secret: str
+    google_redirect_uri: str
+    google_developer_token: str
+    frontend_url: str
+
+
+def _clean(name: str, default: str = "") -> str:
+    """Reads an env var, dropping quotes left over from the .env file and then surrounding whitespace."""
+    return os.environ.get(name, default).replace('"', '').replace("'", "").strip()
+
+
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    """Loads global.env (local only) and returns the shared Config."""
+    # Loaded once per process; variables already set in the real environment win
+    if ENV_PATH.exists():
+        load_dotenv(ENV_PATH)
+
+    return Config(
+        # Meta OAuth Configuration
+        meta_client_id=_clean("META_CLIENT_ID"),
+        meta_client_secret=_clean("META_CLIENT_SECRET"),
+        meta_redirect_uri=_clean("META_REDIRECT_URI", "http://localhost:8000/api/auth/meta/callback"),
+        # Google OAuth Configuration
+        google_client_id=_clean("GOOGLE_CLIENT_ID"),
+        google_client_secret=_clean("GOOGLE_CLIENT_SECRET"),
+        google_redirect_uri=_clean("GOOGLE_REDIRECT_URI", "http://localhost:8000/api/auth/google/callback"),
+        google_developer_token=_clean("GOOGLE_DEVELOPER_TOKEN"),
+        # CORS
+        frontend_url=_clean("FRONTEND_URL", "http://localhost:3000"),
+    )
@@ -0,0 +1,37 @@
+"""
+Logging for the sync workers.
+Records go through a QueueHandler and one background listener thread writes them,
+so parallel fetch workers never wait on stdout. Set SYNC_LOG_LEVEL=DEBUG for
+per-account traces.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Returns a 'sync.<name>' logger wired to the shared background handler."""
+    global _listener
+    with _setup_lock:
+        if _listener is None:
+            log_queue = queue.SimpleQueue()
+            handler = logging.StreamHandler(sys.stdout)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            _listener = logging.handlers.QueueListener(log_queue, handler)
+            _listener.start()
+            # Flush whatever is still queued when the process exits
+            atexit.register(_listener.stop)
+
+            root = logging.getLogger("sync")
+            root.addHandler(logging.handlers.QueueHandler(log_queue))
+            root.setLevel(os.getenv("SYNC_LOG_LEVEL", "INFO").upper())
+            root.propagate = False
+    return logging.getLogger(f"sync.{name}")
@@ -1,53 +1,80 @@
+import base64
+import binascii
 import os
-from cryptography.fernet import Fernet
-from dotenv import load_dotenv
+from cryptography.fernet import Fernet, InvalidToken
+from utils.config import get_config
 
-# Load environment variables
-ENV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), 'global.env')
-load_dotenv(ENV_PATH, override=True)
+# Load environment variables (once per process)
+get_config()
 
 # Get the encryption key from environment
 ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY")
 
-def get_fernet():
-    if not ENCRYPTION_KEY:
-        # We don't raise an error here to prevent the app from crashing on start if just generating key
-        # but the app will fail if it tries to encrypt/decrypt without it.
-        return None
-    return Fernet(ENCRYPTION_KEY.encode())
+# Build the Fernet instance once at import; the key never changes at runtime.
+# We don't raise an error here to prevent the app from crashing on start if just generating key
+# but the app will fail if it tries to encrypt/decrypt without it.
+_FERNET = Fernet(ENCRYPTION_KEY.encode()) if ENCRYPTION_KEY else None
+
+# Every Fernet token starts with the version byte 0x80
+_FERNET_VERSION = 0x80
+
+def _is_fernet_token(token: str) -> bool:
+    """Cheap check for the Fernet version marker without touching the crypto."""
+    # 0x80 always base64-encodes to a leading 'g', which rejects most plain text outright
+    if not token or token[0] != 'g':
+        return False
+    try:
+        # The first 4 base64 chars decode to the first 3 bytes of the token
+        return base64.urlsafe_b64decode(token[:4] + '=' * (-len(token[:4]) % 4))[0] == _FERNET_VERSION
+    except (binascii.Error, ValueError, IndexError):
+        return False
 
 def encrypt_token(token: str) -> str:
     """Encrypts a plain text token."""
-    f = get_fernet()
-    if not f:
+    if not _FERNET:
         print("CRITICAL: ENCRYPTION_KEY not found in global.env")
         return token
-    return f.encrypt(token.encode()).decode()
+    return _FERNET.encrypt(token.encode()).decode()
 
 def decrypt_token(encrypted_token: str) -> str:
-    """Decrypts an encrypted token. Returns plain text tokens unchanged."""
-    f = get_fernet()
-    if not f:
+    """
+    Decrypts an encrypted token. Returns plain text tokens unchanged.
+    Not memoized: plain text tokens shouldn't outlive the sync that needs them.
+    """
+    if not _FERNET:
         print("CRITICAL: ENCRYPTION_KEY not found in global.env")
         return encrypted_token
     
     # Check if token is already plain text (not encrypted)
-    # Fernet tokens always start with 'gAAAAAB'
-    if not encrypted_token.startswith('gAAAAAB'):
+    if not _is_fernet_token(encrypted_token):
         # Token is plain text, return as-is
         return encrypted_token
     
     try:
-        return f.decrypt(encrypted_token.encode()).decode()
-    except Exception as e:
-        print(f"Error decrypting token: {e}")
+        return _FERNET.decrypt(encrypted_token.encode()).decode()
+    except InvalidToken:
+        print("Error decrypting token: invalid token")
         # If decryption fails, assume it's plain text
         return encrypted_token
-    try:
-        return f.decrypt(encrypted_token.encode()).decode()
-    except Exception as e:
-        print(f"Error decrypting token: {e}")
-        return encrypted_token
+
+def decrypt_tokens(tokens: list[str]) -> list[str]:
+    """Decrypts a batch of tokens in one pass. Plain text tokens are returned unchanged."""
+    if not _FERNET:
+        print("CRITICAL: ENCRYPTION_KEY not found in global.env")
+        return list(tokens)
+
+    decrypt = _FERNET.decrypt
+    results = []
+    for token in tokens:
+        if not _is_fernet_token(token):
+            results.append(token)
+            continue
+        try:
+            results.append(decrypt(token.encode()).decode())
+        except InvalidToken:
+            print("Error decrypting token: invalid token")
+            results.append(token)
+    return results
 
 if __name__ == "__main__":
     # Script to generate a new key if run directly
@@ -8,36 +8,86 @@ Rules:
 - If all slots are used, the user must wait for the oldest slot to expire.
 """
 
+import concurrent.futures
 import datetime
 import os
-import boto3
-from dotenv import load_dotenv
+import random
+import threading
+import time
+from botocore.exceptions import ClientError
+from utils.config import get_config
 
-# Load env for AWS credentials
-ENV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), 'global.env')
-load_dotenv(ENV_PATH, override=True)
+# Load env for AWS credentials (once per process)
+get_config()
+
+from Database.database import get_dynamodb_resource
 
 MAX_SYNCS = 3
 COOLDOWN_HOURS = 3
+COOLDOWN_SECONDS = COOLDOWN_HOURS * 3600
+# DynamoDB TTL attribute: the tracker item is deleted once its newest sync has expired
+TTL_ATTRIBUTE = 'expires_at'
+TABLE_NAME = "SyncTracking"
+# Module-level handle: every SyncTracker shares it, and the table is checked once per process
+_TABLE = get_dynamodb_resource().Table(TABLE_NAME)
+_table_ready = False
+
+# Number of items the timestamps are spread over, so a shared limiter doesn't pin one hot
+# partition. Each shard holds at most SHARD_MAX_SYNCS entries; 1 keeps the single 'global' item.
+# The shard caps must add up to exactly MAX_SYNCS, so the count has to divide it.
+_requested_shards = max(1, int(os.getenv("SYNC_TRACKER_SHARDS", "1")))
+SHARDS = max(n for n in range(1, min(_requested_shards, MAX_SYNCS) + 1) if MAX_SYNCS % n == 0)
+if SHARDS != _requested_shards:
+    print(f"SYNC_TRACKER_SHARDS={_requested_shards} doesn't divide MAX_SYNCS={MAX_SYNCS}, using {SHARDS} shards")
+SHARD_MAX_SYNCS = MAX_SYNCS // SHARDS
+SHARD_KEYS = ('global',) if SHARDS == 1 else tuple(f"global#{k}" for k in range(SHARDS))
+_READER = concurrent.futures.ThreadPoolExecutor(max_workers=SHARDS, thread_name_prefix="sync-tracker-read") if SHARDS > 1 else None
+
+# Status is served from memory; DynamoDB is re-read this often to pick up syncs recorded
+# by other processes. Reserving a slot (record_sync) always goes to DynamoDB.
+RECONCILE_SECONDS = 60
+
+# Status returned while no sync is active; callers only read it
+_EMPTY_STATUS = {
+    "syncs_used": 0,
+    "syncs_remaining": MAX_SYNCS,
+    "max_syncs": MAX_SYNCS,
+    "can_sync": True,
+    "cooldown_hours": COOLDOWN_HOURS,
+    "next_free_at": None,
+    "cooldown_seconds_remaining": 0,
+}
 
 
 class SyncTracker:
     def __init__(self):
-        self.dynamodb = boto3.resource(
-            'dynamodb',
-            region_name=os.getenv("AWS_REGION", "us-east-1"),
-            aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-            aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
-        )
-        self.table_name = "SyncTracking"
-        self.table = None
+        # Shared pooled/keep-alive resource, so status polls reuse warm connections
+        self.dynamodb = get_dynamodb_resource()
+        self.table_name = TABLE_NAME
+        self.table = _TABLE
+        # In-process view of the active sync timestamps (epoch seconds)
+        self._local_timestamps = []
+        self._loaded_at = None
+        # Until this monotonic time the window is known to be empty and get_status skips all work
+        self._known_empty_until = 0.0
+        self._lock = threading.Lock()
+        # Single-flight tracker read: concurrent polls wait on the one already in flight
+        self._inflight = None
+        self._inflight_lock = threading.Lock()
         self._init_table()
 
     def _init_table(self):
-        """Create the SyncTracking table if it doesn't exist."""
+        """Create the SyncTracking table if it doesn't exist (checked once per process)."""
+        global _table_ready
+        if _table_ready:
+            return
         try:
-            existing = [t.name for t in self.dynamodb.tables.all()]
-            if self.table_name not in existing:
+            try:
+                # DescribeTable on the one table instead of paging through ListTables
+                self.table.load()
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ResourceNotFoundException':
+                    raise
                 print(f"Creating {self.table_name} table...")
                 self.dynamodb.create_table(
                     TableName=self.table_name,
@@ -47,49 +97,132 @@ class SyncTracker:
                     AttributeDefinitions=[
                         {'AttributeName': 'tracker_id', 'AttributeType': 'S'},
                     ],
-                    ProvisionedThroughput={'ReadCapacityUnits': 5, 'WriteCapacityUnits': 5}
+                    # On-demand: provisions faster and has no idle capacity cost for a single small item
+                    BillingMode='PAY_PER_REQUEST'
                 )
                 waiter = self.dynamodb.meta.client.get_waiter('table_exists')
-                waiter.wait(TableName=self.table_name)
+                waiter.wait(TableName=self.table_name, WaiterConfig={'Delay': 2, 'MaxAttempts': 30})
                 print(f"✅ {self.table_name} table created.")
-            self.table = self.dynamodb.Table(self.table_name)
+            self._enable_ttl()
+            _table_ready = True
         except Exception as e:
             print(f"Error initializing {self.table_name} table: {e}")
 
-    def _get_tracker(self) -> dict:
-        """Read the current tracker item from DynamoDB."""
+    def _enable_ttl(self):
+        """Turns on DynamoDB TTL for expires_at, so an idle tracker cleans itself up."""
+        client = self.dynamodb.meta.client
+        ttl = client.describe_time_to_live(TableName=self.table_name)['TimeToLiveDescription']
+        if ttl.get('TimeToLiveStatus') in ('ENABLED', 'ENABLING'):
+            return
+        client.update_time_to_live(
+            TableName=self.table_name,
+            TimeToLiveSpecification={'Enabled': True, 'AttributeName': TTL_ATTRIBUTE}
+        )
+
+    def _get_shard(self, tracker_id: str) -> dict:
+        """Read one tracker item from DynamoDB."""
         try:
-            response = self.table.get_item(Key={'tracker_id': 'global'})
-            return response.get('Item', {'tracker_id': 'global', 'sync_timestamps': []})
+            # Only the list is needed; an eventually consistent read is half the RCU
+            response = self.table.get_item(
+                Key={'tracker_id': tracker_id},
+                ProjectionExpression='sync_timestamps',
+                ConsistentRead=False
+            )
+            item = response.get('Item', {})
+            return {'tracker_id': tracker_id, 'sync_timestamps': item.get('sync_timestamps', [])}
         except Exception as e:
             print(f"Error reading sync tracker: {e}")
-            return {'tracker_id': 'global', 'sync_timestamps': []}
+            return None
+
+    def _get_tracker(self) -> dict:
+        """
+        Read the current tracker from DynamoDB.
+        Concurrent callers share the read already in flight instead of issuing their own.
+        """
+        with self._inflight_lock:
+            future = self._inflight
+            owner = future is None
+            if owner:
+                future = concurrent.futures.Future()
+                self._inflight = future
+        if not owner:
+            return future.result()
 
-    def _save_tracker(self, tracker: dict):
-        """Persist the tracker item to DynamoDB."""
         try:
-            self.table.put_item(Item=tracker)
+            tracker = self._read_tracker()
+            future.set_result(tracker)
+            return tracker
         except Exception as e:
-            print(f"Error saving sync tracker: {e}")
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight = None
+
+    def _read_tracker(self) -> dict:
+        """Read the current tracker from DynamoDB, combining the shards in parallel."""
+        if _READER is None:
+            return self._get_shard(SHARD_KEYS[0])
+        shards = list(_READER.map(self._get_shard, SHARD_KEYS))
+        if any(shard is None for shard in shards):
+            return None
+        return {'tracker_id': 'global', 'sync_timestamps': [ts for shard in shards for ts in shard['sync_timestamps']]}
+
+    def _local_active(self) -> tuple:
+        """
+        Returns (active timestamps, oldest active timestamp) from memory, reloading
+        from DynamoDB on first use and every RECONCILE_SECONDS after that.
+        """
+        if self._loaded_at is None or time.monotonic() - self._loaded_at >= RECONCILE_SECONDS:
+            tracker = self._get_tracker()
+            if tracker is not None:
+                with self._lock:
+                    self._local_timestamps = self._get_active_timestamps(tracker.get('sync_timestamps', []))
+                    self._loaded_at = time.monotonic()
+        with self._lock:
+            return self._scan_active(self._local_timestamps)
+
+    @staticmethod
+    def _epoch(ts) -> int:
+        """Timestamps are stored as epoch seconds; items written before that hold naive UTC ISO strings."""
+        if isinstance(ts, str):
+            return int(datetime.datetime.fromisoformat(ts).replace(tzinfo=datetime.timezone.utc).timestamp())
+        return int(ts)
+
+    def _scan_active(self, timestamps: list) -> tuple:
+        """
+        Single pass over the timestamps: drops those older than the cooldown window
+        and tracks the oldest one kept. Returns (active epoch seconds, oldest or None).
+        """
+        cutoff = int(time.time()) - COOLDOWN_SECONDS
+        active, oldest = [], None
+        for ts in map(self._epoch, timestamps):
+            if ts > cutoff:
+                active.append(ts)
+                if oldest is None or ts < oldest:
+                    oldest = ts
+        return active, oldest
 
     def _get_active_timestamps(self, timestamps: list) -> list:
-        """Filter out timestamps older than the cooldown window."""
-        now = datetime.datetime.utcnow()
-        cooldown = datetime.timedelta(hours=COOLDOWN_HOURS)
-        return [ts for ts in timestamps if now - datetime.datetime.fromisoformat(ts) < cooldown]
+        """Filter out timestamps older than the cooldown window. Returns epoch seconds."""
+        return self._scan_active(timestamps)[0]
 
     def get_status(self) -> dict:
         """
         Returns the current sync status for the frontend.
         """
-        tracker = self._get_tracker()
-        raw_timestamps = tracker.get('sync_timestamps', [])
-        active = self._get_active_timestamps(raw_timestamps)
+        if time.monotonic() < self._known_empty_until:
+            return _EMPTY_STATUS
 
-        # Persist cleanup if timestamps expired
-        if len(active) != len(raw_timestamps):
-            tracker['sync_timestamps'] = active
-            self._save_tracker(tracker)
+        # Read-only and usually in-memory: expired entries are filtered here, pruned by record_sync and TTL
+        active, oldest = self._local_active()
+        if not active:
+            # Nothing can change until this process records a sync or the next reconcile
+            # could pick up one from another process
+            with self._lock:
+                if self._loaded_at is not None:
+                    self._known_empty_until = self._loaded_at + RECONCILE_SECONDS
+            return _EMPTY_STATUS
 
         syncs_used = len(active)
         syncs_remaining = max(0, MAX_SYNCS - syncs_used)
@@ -98,12 +231,11 @@ class SyncTracker:
         # Calculate cooldown info
         next_free_at = None
         cooldown_seconds_remaining = 0
-        if not can_sync and active:
-            oldest = min(datetime.datetime.fromisoformat(ts) for ts in active)
-            free_at = oldest + datetime.timedelta(hours=COOLDOWN_HOURS)
-            next_free_at = free_at.isoformat()
-            diff = free_at - datetime.datetime.utcnow()
-            cooldown_seconds_remaining = max(0, int(diff.total_seconds()))
+        if not can_sync and oldest is not None:
+            free_at = oldest + COOLDOWN_SECONDS
+            # Naive UTC ISO string; the frontend appends the "Z"
+            next_free_at = datetime.datetime.fromtimestamp(free_at, datetime.timezone.utc).replace(tzinfo=None).isoformat()
+            cooldown_seconds_remaining = max(0, free_at - int(time.time()))
 
         return {
             "syncs_used": syncs_used,
@@ -115,15 +247,100 @@ class SyncTracker:
             "cooldown_seconds_remaining": cooldown_seconds_remaining,
         }
 
-    def record_sync(self):
-        """Record a successful sync timestamp."""
-        tracker = self._get_tracker()
+    def record_sync(self) -> bool:
+        """
+        Reserves a sync slot. Call it before the sync runs, so a full window is refused up front.
+        A full in-process count is rejected without a round trip; otherwise one conditional
+        write claims a slot in a shard. Each shard's cap is checked atomically and the caps add
+        up to MAX_SYNCS, so concurrent triggers (from this or another process) can't push the
+        total past the limit. Returns False if no slot was free.
+        """
+        now = int(time.time())
+        self._local_active()  # make sure the local view has been loaded once
+        with self._lock:
+            active = self._get_active_timestamps(self._local_timestamps)
+            if len(active) >= MAX_SYNCS:
+                print(f"Sync not recorded: {MAX_SYNCS}/{MAX_SYNCS} syncs already used in current window.")
+                return False
+            active.append(now)
+            self._local_timestamps = active
+            self._known_empty_until = 0.0
+
+        if not self._persist_sync(now):
+            with self._lock:
+                # Another process took the last slot; drop the local claim by reloading on the next read
+                self._loaded_at = None
+            print(f"Sync not recorded: {MAX_SYNCS}/{MAX_SYNCS} syncs already used in current window.")
+            return False
+        print(f"✅ Sync recorded. {len(active)}/{MAX_SYNCS} syncs used in current window.")
+        return True
+
+    def _persist_sync(self, now: int) -> bool:
+        """
+        Claims a slot for `now` in DynamoDB.
+        A conditional UpdateItem appends to a shard while it holds fewer than SHARD_MAX_SYNCS
+        entries. Shards are tried in random order, so one full shard doesn't refuse a sync
+        while others have room. Returns False only if every shard is full; other DynamoDB
+        errors let the sync through on the local count alone.
+        """
+        for tracker_id in random.sample(SHARD_KEYS, len(SHARD_KEYS)):
+            try:
+                response = self.table.update_item(
+                    Key={'tracker_id': tracker_id},
+                    UpdateExpression='SET sync_timestamps = list_append(if_not_exists(sync_timestamps, :empty), :new), #ttl = :expires',
+                    ConditionExpression='attribute_not_exists(sync_timestamps) OR size(sync_timestamps) < :max',
+                    ExpressionAttributeNames={'#ttl': TTL_ATTRIBUTE},
+                    ExpressionAttributeValues={':empty': [], ':new': [now], ':max': SHARD_MAX_SYNCS, ':expires': now + COOLDOWN_SECONDS},
+                    ReturnValues='ALL_NEW'
+                )
+                tracker = response['Attributes']
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    print(f"Error saving sync tracker: {e}")
+                    return True
+                # The shard is full, but some entries may have expired
+                tracker = self._prune_and_append(now, tracker_id)
+                if tracker is None:
+                    continue
+            except Exception as e:
+                print(f"Error saving sync tracker: {e}")
+                return True
+
+            if SHARDS == 1:
+                # The single item is the whole tracker, so it can replace the local view
+                with self._lock:
+                    self._local_timestamps = self._get_active_timestamps(tracker['sync_timestamps'])
+                    self._loaded_at = time.monotonic()
+            return True
+        return False
+
+    def _prune_and_append(self, timestamp: int, tracker_id: str):
+        """
+        Slow path of record_sync: drops expired timestamps from one shard and appends `timestamp`,
+        conditional on the list being unchanged since it was read.
+        Returns the saved shard, or None if every slot in it is still in use.
+        """
+        tracker = self._get_shard(tracker_id)
+        if tracker is None:
+            return None
         raw_timestamps = tracker.get('sync_timestamps', [])
         active = self._get_active_timestamps(raw_timestamps)
-        active.append(datetime.datetime.utcnow().isoformat())
-        tracker['sync_timestamps'] = active
-        self._save_tracker(tracker)
-        print(f"✅ Sync recorded. {len(active)}/{MAX_SYNCS} syncs used in current window.")
+        if len(active) >= SHARD_MAX_SYNCS:
+            return None
+
+        tracker['sync_timestamps'] = active + [timestamp]
+        tracker[TTL_ATTRIBUTE] = timestamp + COOLDOWN_SECONDS
+        try:
+            self.table.put_item(
+                Item=tracker,
+                ConditionExpression='sync_timestamps = :old',
+                ExpressionAttributeValues={':old': raw_timestamps}
+            )
+        except ClientError as e:
+            # Another process changed the list in between; its write stands
+            print(f"Error saving sync tracker: {e}")
+            return None
+        return tracker
 
     def can_sync(self) -> bool:
         """Quick check if a sync is currently allowed."""
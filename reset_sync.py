@@ -1,41 +1,68 @@
 import boto3
+import concurrent.futures
 import os
+from pathlib import Path
+from botocore.config import Config
 from dotenv import load_dotenv
 
 # Load env for AWS credentials
-ENV_PATH = os.path.join(os.path.dirname(__file__), 'global.env')
-if not os.path.exists(ENV_PATH):
+_HERE = Path(__file__).resolve().parent
+ENV_PATH = _HERE / 'global.env'
+if not ENV_PATH.exists():
     # Fallback if run from a different directory
-    ENV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'global.env')
+    ENV_PATH = _HERE.parents[1] / 'global.env'
 
-load_dotenv(ENV_PATH, override=True)
+load_dotenv(ENV_PATH)
 
-def reset_sync_limit():
-    dynamodb = boto3.resource(
-        'dynamodb',
-        region_name=os.getenv("AWS_REGION", "us-east-1"),
-        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
+# One session per process, so credentials are resolved once and every client shares them.
+# Built at import, so repeated calls in a warm process skip resource construction.
+_SESSION = boto3.Session(
+    region_name=os.getenv("AWS_REGION", "us-east-1"),
+    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
+)
+_DDB = _SESSION.resource(
+    'dynamodb',
+    config=Config(
+        retries={'max_attempts': 3, 'mode': 'adaptive'},
+        connect_timeout=5,
+        read_timeout=10
     )
+)
+_TRACKER_TABLE = _DDB.Table("SyncTracking")
+_APP_STATUS_TABLE = _DDB.Table("app_status")
+
+# The API may round SYNC_TRACKER_SHARDS down (utils/sync_tracker.py), so delete every key
+# it could be using: the unsharded 'global' item and each shard up to the requested count.
+_SHARDS = max(1, int(os.getenv("SYNC_TRACKER_SHARDS", "1")))
+_TRACKER_KEYS = ['global'] + ([f"global#{k}" for k in range(_SHARDS)] if _SHARDS > 1 else [])
+
+def _reset_tracker():
+    with _TRACKER_TABLE.batch_writer() as batch:
+        for key in _TRACKER_KEYS:
+            batch.delete_item(Key={'tracker_id': key})
 
-    # 1. Reset the actual tracker used by the application
-    try:
-        table_name = "SyncTracking"
-        table = dynamodb.Table(table_name)
-        table.delete_item(Key={'tracker_id': 'global'})
-        print(f"✅ Sync limit reset in table '{table_name}'.")
-    except Exception as e:
-        print(f"❌ Could not reset '{table_name}': {e}")
-
-    # 2. Reset the 'app_status' table mentioned by the user (if it exists)
-    try:
-        user_table_name = 'app_status'
-        user_table = dynamodb.Table(user_table_name)
-        user_table.delete_item(Key={'id': 'global_sync'})
-        print(f"✅ Sync limit reset in table '{user_table_name}'.")
-    except Exception as e:
-        # Silently fail if table doesn't exist, as it's not the primary one
-        pass
+def _reset_app_status():
+    _APP_STATUS_TABLE.delete_item(Key={'id': 'global_sync'})
+
+def reset_sync_limit():
+    # 1. Reset the actual tracker used by the application and
+    # 2. the 'app_status' table mentioned by the user.
+    # Independent tables and keys, so both deletes run at once; a missing
+    # 'app_status' table only fails its own delete.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        futures = {
+            _TRACKER_TABLE.name: executor.submit(_reset_tracker),
+            _APP_STATUS_TABLE.name: executor.submit(_reset_app_status),
+        }
+        for table_name, future in futures.items():
+            try:
+                future.result()
+                print(f"✅ Sync limit reset in table '{table_name}'.")
+            except Exception as e:
+                # 'app_status' is optional; only the tracker failing is worth reporting
+                if table_name == _TRACKER_TABLE.name:
+                    print(f"❌ Could not reset '{table_name}': {e}")
 
 if __name__ == "__main__":
     reset_sync_limit()